@@ -0,0 +1,202 @@
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from local_database import load_json_file, save_json_file
+from order_snapshot import get_orders_snapshot, wall_clock_seconds
+
+logger = logging.getLogger(__name__)
+
+# Admission settings, editable from the Admin Panel
+ADMISSION_FILE = "admission.json"
+DEFAULT_SETTINGS = {
+    "max_wait_minutes": 30.0,
+    "default_unit_minutes": 2.0,
+    "window_minutes": 120,
+    "paused_items": []
+}
+
+# Orders waiting for or being cooked count toward the queue
+QUEUED_STATUSES = ["pending", "in_progress"]
+# An item needs this many measured orders before it gets its own prep time
+MIN_ITEM_SAMPLES = 3
+LOAD_CACHE_SECONDS = 15
+
+def get_admission_settings() -> Dict[str, Any]:
+    """Get admission settings merged over the defaults"""
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(load_json_file(ADMISSION_FILE, DEFAULT_SETTINGS))
+    return settings
+
+def save_admission_settings(settings: Dict[str, Any]) -> bool:
+    """Save admission settings"""
+    return save_json_file(ADMISSION_FILE, settings)
+
+def _order_units(order: Dict[str, Any]) -> Dict[str, int]:
+    units = {}
+    if 'items' in order:
+        for item in order['items']:
+            units[item['momo_type']] = units.get(item['momo_type'], 0) + item.get('quantity', 0)
+    else:
+        # Handle old order format
+        units[order.get('momo_type', 'Unknown')] = order.get('quantity', 1)
+    return units
+
+def _minutes_between(start: str, end: str) -> Optional[float]:
+    try:
+        return (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds() / 60
+    except (TypeError, ValueError):
+        return None
+
+def measure_unit_minutes(completed: List[Dict[str, Any]], default_unit_minutes: float) -> Tuple[Dict[str, float], float, float]:
+    """Estimate prep minutes per unit of each item from recently cooked orders.
+
+    Returns (per-item minutes, pooled minutes for unmeasured items, parallelism),
+    where parallelism is how many orders the kitchen works on at once.
+    """
+    samples = []
+    for order in completed:
+        duration = _minutes_between(order.get('in_progress_at'), order.get('ready_at'))
+        if duration is not None and duration > 0:
+            samples.append((_order_units(order), duration, order['in_progress_at'], order['ready_at']))
+    if not samples:
+        return {}, default_unit_minutes, 1.0
+
+    items = sorted({item for units, _, _, _ in samples for item in units})
+    units_matrix = np.array([[units.get(item, 0) for item in items] for units, _, _, _ in samples], dtype=float)
+    durations = np.array([duration for _, duration, _, _ in samples])
+
+    pooled = float(durations.sum() / max(units_matrix.sum(), 1.0))
+    solution, _, _, _ = np.linalg.lstsq(units_matrix, durations, rcond=None)
+    item_samples = (units_matrix > 0).sum(axis=0)
+    unit_minutes = {}
+    for item, minutes, count in zip(items, solution, item_samples):
+        # Fall back to the pooled rate where the fit is unsupported or nonsensical
+        unit_minutes[item] = float(minutes) if count >= MIN_ITEM_SAMPLES and minutes > 0 else pooled
+
+    # Overlapping cook intervals mean the kitchen runs several orders in parallel
+    intervals = sorted((wall_clock_seconds(start), wall_clock_seconds(end)) for _, _, start, end in samples)
+    busy_seconds = 0.0
+    current_start, current_end = intervals[0]
+    for start, end in intervals[1:]:
+        if start > current_end:
+            busy_seconds += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    busy_seconds += current_end - current_start
+    parallelism = max(1.0, float(durations.sum() * 60 / busy_seconds)) if busy_seconds > 0 else 1.0
+
+    return unit_minutes, pooled, parallelism
+
+def compute_kitchen_load(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Measure queue depth and throughput from the shared orders snapshot"""
+    snapshot = get_orders_snapshot()
+    now = wall_clock_seconds(datetime.now().isoformat())
+    queue_units: Dict[str, int] = {}
+    pending_units: Dict[str, int] = {}
+    cooking = []
+    queued = snapshot.positions_with_status(QUEUED_STATUSES)
+    for position in queued:
+        order = snapshot.record(position)
+        units = _order_units(order)
+        for item, quantity in units.items():
+            queue_units[item] = queue_units.get(item, 0) + quantity
+        if order.get('status') == 'in_progress':
+            cooking.append((units, order.get('in_progress_at')))
+        else:
+            for item, quantity in units.items():
+                pending_units[item] = pending_units.get(item, 0) + quantity
+
+    # Orders that finished cooking inside the window, however long ago they were placed
+    window_start = now - settings['window_minutes'] * 60
+    recent = np.flatnonzero(snapshot.index['ready_at'] >= window_start)
+    completed = [snapshot.record(position) for position in recent]
+    unit_minutes, pooled, parallelism = measure_unit_minutes(completed, settings['default_unit_minutes'])
+
+    load = {
+        "queue_units": queue_units,
+        "queued_orders": len(queued),
+        "unit_minutes": unit_minutes,
+        "pooled_unit_minutes": pooled,
+        "parallelism": parallelism,
+        "samples": len(completed)
+    }
+    # Orders already on the stove only need the rest of their prep time
+    work = work_minutes(load, pending_units)
+    for units, started in cooking:
+        elapsed = (now - wall_clock_seconds(started)) / 60
+        work += max(0.0, work_minutes(load, units) - (0.0 if math.isnan(elapsed) else elapsed))
+    load["queue_minutes"] = work / parallelism
+    return load
+
+# Load is shared by every session in the process and refreshed on new snapshots
+_load_cache: Dict[str, Any] = {}
+_load_lock = threading.Lock()
+
+def get_kitchen_load(settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Get the current kitchen load, recomputed when orders change or the cache ages out"""
+    if settings is None:
+        settings = get_admission_settings()
+    snapshot = get_orders_snapshot()
+    # The source signature changes on every write, unlike the snapshot's inode which can be reused
+    key = (snapshot.source_signature, settings['window_minutes'], settings['default_unit_minutes'])
+    with _load_lock:
+        if _load_cache.get("key") != key or time.monotonic() - _load_cache.get("at", 0) > LOAD_CACHE_SECONDS:
+            _load_cache["load"] = compute_kitchen_load(settings)
+            _load_cache["key"] = key
+            _load_cache["at"] = time.monotonic()
+        return _load_cache["load"]
+
+def unit_minutes_for(load: Dict[str, Any], item_name: str) -> float:
+    return load["unit_minutes"].get(item_name, load["pooled_unit_minutes"])
+
+def work_minutes(load: Dict[str, Any], units: Dict[str, int]) -> float:
+    """Cook minutes for the given units, before spreading across parallel orders"""
+    return sum(quantity * unit_minutes_for(load, item) for item, quantity in units.items())
+
+def estimate_minutes(load: Dict[str, Any], units: Dict[str, int]) -> float:
+    """Kitchen minutes needed to cook the given units"""
+    return work_minutes(load, units) / load["parallelism"]
+
+def estimate_wait(load: Dict[str, Any], cart: List[Dict[str, Any]]) -> float:
+    """Minutes until a new order with these cart items would be ready"""
+    return load["queue_minutes"] + estimate_minutes(load, _order_units({"items": cart}))
+
+def item_limits(load: Dict[str, Any], settings: Dict[str, Any], item_names: List[str], cart: Optional[List[Dict[str, Any]]] = None) -> Dict[str, int]:
+    """Most units of each item that can still be added without exceeding the wait limit; 0 means paused"""
+    base_wait = estimate_wait(load, cart or [])
+    headroom = settings['max_wait_minutes'] - base_wait
+    limits = {}
+    for item_name in item_names:
+        if item_name in settings['paused_items']:
+            limits[item_name] = 0
+            continue
+        per_unit = unit_minutes_for(load, item_name) / load["parallelism"]
+        limits[item_name] = max(0, math.floor(headroom / per_unit)) if per_unit > 0 else 50
+    return limits
+
+def admit_order(cart: List[Dict[str, Any]], settings: Optional[Dict[str, Any]] = None) -> Tuple[bool, Optional[float], str]:
+    """Decide whether the kitchen can take this order, returning (admitted, eta minutes, reason)
+
+    If the kitchen load cannot be read the order is admitted with no ETA rather than refused.
+    """
+    if settings is None:
+        settings = get_admission_settings()
+    try:
+        eta = estimate_wait(get_kitchen_load(settings), cart)
+    except Exception as e:
+        logger.warning(f"Kitchen load unavailable, admitting without an ETA: {str(e)}")
+        eta = None
+
+    paused = sorted({item['momo_type'] for item in cart} & set(settings['paused_items']))
+    if paused:
+        return False, eta, f"{', '.join(paused)} is paused right now."
+    if eta is not None and eta > settings['max_wait_minutes'] and cart:
+        return False, eta, f"The kitchen is at capacity (estimated wait {eta:.0f} min, limit {settings['max_wait_minutes']:.0f} min)."
+    return True, eta, ""
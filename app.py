@@ -1,19 +1,35 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import json
 from local_database import (
     save_order,
-    get_orders,
     update_order_status,
-    delete_order,
     save_menu_item,
     get_menu,
     delete_menu_item,
     save_inventory,
     get_inventory,
-    get_order_statistics
+    get_order_statistics,
+    transition_orders,
+    ACTIVE_STATUSES,
+    STATUS_TRANSITIONS
 )
+from cloud_sync import is_configured as cloud_sync_configured, start_replication
+from order_search import search_orders
+from order_snapshot import get_order_history, get_orders_snapshot
+from admission_control import (
+    get_admission_settings,
+    save_admission_settings,
+    get_kitchen_load,
+    estimate_wait,
+    item_limits,
+    unit_minutes_for,
+    admit_order
+)
+from demand_forecast import PREP_WINDOW_HOURS, prep_ahead, forecast_report
+from order_status import find_orders, get_order_status, get_order_ids_by_status, get_status_cache, order_number
 
 # App configuration
 st.set_page_config(
@@ -22,6 +38,19 @@ st.set_page_config(
     layout="wide"
 )
 
+# Cloud replication runs in one background thread per server process
+@st.cache_resource
+def get_replicator():
+    if not cloud_sync_configured():
+        return None
+    try:
+        return start_replication()
+    except Exception as e:
+        st.warning(f"Cloud sync disabled: {str(e)}")
+        return None
+
+get_replicator()
+
 # Custom CSS for better styling
 st.markdown("""
 <style>
@@ -53,7 +82,26 @@ st.markdown('<h1 class="main-header">🥟 Yummoz - Momo Shop Management System</
 
 # Sidebar navigation
 st.sidebar.title("Navigation")
-page = st.sidebar.selectbox("Select Page", ["Customer Order", "Cook's View", "Admin Panel"])
+page = st.sidebar.selectbox("Select Page", ["Customer Order", "Order Status", "Cook's View", "Admin Panel"])
+
+# Order lifecycle display text
+STATUS_LABELS = {
+    "pending": "⏳ Pending",
+    "in_progress": "🔥 In Progress",
+    "ready": "✅ Ready for Pickup",
+    "picked_up": "📦 Picked Up",
+    "cancelled": "❌ Cancelled",
+    "completed": "📦 Completed"
+}
+STATUS_ACTIONS = {
+    "in_progress": "🔥 Start",
+    "ready": "✅ Mark Ready",
+    "picked_up": "📦 Picked Up",
+    "cancelled": "❌ Cancel"
+}
+BULK_ACTIONS = ["in_progress", "ready", "picked_up"]
+# Rows decoded and rendered for an admin search
+MAX_SEARCH_RESULTS = 100
 
 def customer_order_page():
     st.header("📝 Customer Order Form")
@@ -66,6 +114,10 @@ def customer_order_page():
     if 'special_instructions' not in st.session_state:
         st.session_state.special_instructions = ""
     
+    # Remind the customer of their last order number after the rerun
+    if st.session_state.get('last_order_id'):
+        st.success(f"🎟️ Your order number is **{order_number(st.session_state.last_order_id)}**. Track it on the Order Status page.")
+    
     # Get menu items for dropdown
     try:
         menu_items = get_menu()
@@ -76,6 +128,17 @@ def customer_order_page():
         st.error(f"Error loading menu: {str(e)}")
         return
     
+    # Live kitchen load decides the ETA and how much of each item can still be ordered
+    admission_settings = get_admission_settings()
+    try:
+        kitchen_load = get_kitchen_load(admission_settings)
+        item_caps = item_limits(kitchen_load, admission_settings, list(menu_items), st.session_state.cart)
+        st.info(f"⏱️ Current kitchen wait: ~{kitchen_load['queue_minutes']:.0f} min ({kitchen_load['queued_orders']} orders ahead)")
+    except Exception:
+        # Keep taking orders without an ETA; only items paused by the kitchen are held back
+        kitchen_load = None
+        item_caps = {item_name: 0 for item_name in admission_settings['paused_items']}
+    
     # Customer information
     col1, col2 = st.columns(2)
     with col1:
@@ -114,12 +177,23 @@ def customer_order_page():
                 st.markdown(f"**{item_name}**")
                 st.markdown(f"Price: **${price:.2f}**")
                 
+                item_cap = min(50, item_caps.get(item_name, 50))
+                if item_name in admission_settings['paused_items']:
+                    st.warning("⏸️ Paused by the kitchen")
+                    st.divider()
+                    continue
+                if item_cap == 0:
+                    st.warning("⏸️ Paused - the kitchen is at capacity")
+                    st.divider()
+                    continue
+                
                 # Quantity controls
                 col1, col2, col3 = st.columns([1, 2, 1])
                 
                 # Initialize quantity in session state for this item
                 if f"qty_{item_name}" not in st.session_state:
                     st.session_state[f"qty_{item_name}"] = 1
+                st.session_state[f"qty_{item_name}"] = min(st.session_state[f"qty_{item_name}"], item_cap)
                 
                 with col1:
                     if st.button("➖", key=f"dec_{item_name}"):
@@ -133,7 +207,7 @@ def customer_order_page():
                 
                 with col3:
                     if st.button("➕", key=f"inc_{item_name}"):
-                        if st.session_state[f"qty_{item_name}"] < 50:
+                        if st.session_state[f"qty_{item_name}"] < item_cap:
                             st.session_state[f"qty_{item_name}"] += 1
                             st.rerun()
                 
@@ -180,12 +254,17 @@ def customer_order_page():
         
         st.divider()
         st.markdown(f"### **Total: ${total_amount:.2f}**")
+        if kitchen_load is not None:
+            st.markdown(f"⏱️ Estimated ready in **~{estimate_wait(kitchen_load, st.session_state.cart):.0f} min**")
         
         # Submit order button
         col1, col2 = st.columns(2)
         with col1:
             if st.button("🛒 Submit Order", type="primary"):
-                if customer_name.strip():
+                admitted, eta, reason = admit_order(st.session_state.cart, admission_settings)
+                if not admitted:
+                    st.error(f"❌ {reason} Please try again shortly or remove some items.")
+                elif customer_name.strip():
                     try:
                         # Create order data with all cart items
                         order_data = {
@@ -197,10 +276,11 @@ def customer_order_page():
                             "status": "pending"
                         }
                         
-                        success = save_order(order_data)
-                        if success:
+                        order_id = save_order(order_data)
+                        if order_id:
                             st.success("🎉 Order submitted successfully!")
                             st.balloons()
+                            st.session_state.last_order_id = order_id
                             # Clear cart and form
                             st.session_state.cart = []
                             st.session_state.customer_name = ""
@@ -220,6 +300,48 @@ def customer_order_page():
     else:
         st.info("🛒 Your cart is empty. Add some items above!")
 
+def order_status_page():
+    st.header("🎟️ Order Status")
+    
+    if st.button("🔄 Refresh Status"):
+        st.rerun()
+    
+    # Lookups go through the shared in-memory status cache, so polling is cheap
+    default_ref = ""
+    if st.session_state.get('last_order_id'):
+        default_ref = order_number(st.session_state.last_order_id)
+        if len(find_orders(default_ref)) > 1:
+            default_ref = st.session_state.last_order_id
+    order_ref = st.text_input("Order Number", value=default_ref, placeholder="e.g. 653D60C8")
+    
+    if order_ref.strip():
+        matches = find_orders(order_ref)
+        status = get_order_status(matches[0]) if len(matches) == 1 else None
+        if len(matches) > 1:
+            # Short numbers are id prefixes, so two orders can share one
+            st.warning(f"⚠️ {len(matches)} orders share number {order_ref.strip().upper()}. Please enter your full order ID or ask staff to check by name.")
+        elif status is None:
+            st.error("❌ Order not found. Please check your order number.")
+        elif status == "ready":
+            st.success(f"🎉 Order {order_ref.strip().upper()} is ready for pickup!")
+        else:
+            st.info(f"Order {order_ref.strip().upper()}: {STATUS_LABELS.get(status, status.upper())}")
+    
+    st.divider()
+    
+    # Pickup board
+    st.subheader("✅ Ready for Pickup")
+    cache = get_status_cache()
+    ready_ids = get_order_ids_by_status("ready")
+    if ready_ids:
+        cols = st.columns(4)
+        for idx, order_id in enumerate(sorted(ready_ids)):
+            with cols[idx % 4]:
+                st.markdown(f"### {order_number(order_id)}")
+                st.write(cache.customers.get(order_id, ""))
+    else:
+        st.info("No orders waiting for pickup right now.")
+
 def cooks_view_page():
     st.header("👨‍🍳 Cook's Order View")
     
@@ -240,18 +362,74 @@ def cooks_view_page():
     if st.button("🔄 Refresh Orders"):
         st.rerun()
     
+    # Demand forecast from hour-of-week history, net of what is already queued
+    with st.expander(f"🔮 Prep Ahead - next {PREP_WINDOW_HOURS} hour(s)", expanded=True):
+        try:
+            kitchen_load = get_kitchen_load()
+            recommendations = prep_ahead(kitchen_load['queue_units'], list(get_menu()))
+            if recommendations:
+                st.dataframe([{
+                    'Item': rec['item'],
+                    'Expected': f"{rec['expected']:.1f}",
+                    'In Queue': rec['queued'],
+                    'Prep Now': rec['suggested']
+                } for rec in recommendations], use_container_width=True)
+            else:
+                st.info("No extra prep needed for the coming hour.")
+            
+            report = forecast_report()
+            if report['hours']:
+                wape = f", WAPE {report['wape']:.0%}" if report['wape'] is not None else ""
+                st.caption(f"Forecast error over the last {report['hours']} hours: {report['mae']:.1f} units/hour "
+                           f"(same hour last week: {report['baseline_mae']:.1f}{wape}).")
+            else:
+                st.caption("Not enough history yet to score the forecast; it needs at least two weeks of orders.")
+            
+            serve = report['time_to_serve']
+            if serve['current'] is not None:
+                previous = f" vs {serve['previous']:.0f} min the week before" if serve['previous'] is not None else ""
+                st.caption(f"Average time to serve: {serve['current']:.0f} min this week{previous}.")
+        except Exception as e:
+            st.error(f"Error loading demand forecast: {str(e)}")
+    
     try:
-        orders = get_orders()
+        # Shared memory-mapped snapshot; only active orders are decoded
+        snapshot = get_orders_snapshot()
         
-        if orders:
-            # Display all orders (all are pending since completed ones are deleted)
+        if len(snapshot):
+            search_query = st.text_input("🔍 Search orders", placeholder="Customer name, item or instructions", key="cook_search")
+            matching_ids = search_orders(search_query) if search_query.strip() else None
+            
+            # Display orders still in the kitchen (picked up and cancelled ones are kept for history)
             order_list = []
-            for order_id, order_data in orders.items():
+            for position in snapshot.positions_with_status(ACTIVE_STATUSES):
+                order_id = snapshot.order_id(position)
+                if matching_ids is not None and order_id not in matching_ids:
+                    continue
+                order_data = snapshot.record(position)
                 order_data['order_id'] = order_id
                 order_list.append(order_data)
             
-            if order_list:
+            if matching_ids is not None and not order_list:
+                st.info(f"No active orders match \"{search_query.strip()}\".")
+            elif order_list:
                 st.subheader("🔥 Active Orders")
+                
+                # Bulk actions apply to every ticked order in a single write
+                selected_ids = [order['order_id'] for order in order_list if st.session_state.get(f"select_{order['order_id']}", False)]
+                bulk_cols = st.columns(len(BULK_ACTIONS))
+                for bulk_col, status in zip(bulk_cols, BULK_ACTIONS):
+                    with bulk_col:
+                        if st.button(f"{STATUS_ACTIONS[status]} selected ({len(selected_ids)})", key=f"bulk_{status}", disabled=not selected_ids):
+                            changed = transition_orders(selected_ids, status)
+                            for order_id in selected_ids:
+                                st.session_state[f"select_{order_id}"] = False
+                            if changed:
+                                st.success(f"Moved {changed} order(s) to {STATUS_LABELS[status]}.")
+                                st.rerun()
+                            else:
+                                st.error("None of the selected orders can make that change.")
+                
                 for order in order_list:
                     with st.container():
                         col1, col2, col3 = st.columns([3, 1, 1])
@@ -274,25 +452,27 @@ def cooks_view_page():
                             st.write(f"**Time:** {order['timestamp'][:19]}")
                         
                         with col2:
-                            st.write(f"**Status:** {order.get('status', 'pending').upper()}")
+                            current_status = order.get('status', 'pending')
+                            st.write(f"**Status:** {STATUS_LABELS.get(current_status, current_status.upper())}")
+                            st.write(f"**Order #:** {order_number(order['order_id'])}")
+                            st.checkbox("Select", key=f"select_{order['order_id']}")
                         
                         with col3:
-                            if st.button(f"✅ Complete & Remove", key=f"complete_{order['order_id']}"):
-                                try:
-                                    success = delete_order(order['order_id'])
-                                    if success:
-                                        st.success("Order completed and removed!")
-                                        st.rerun()
-                                    else:
-                                        st.error("Failed to complete order.")
-                                except Exception as e:
-                                    st.error(f"Error completing order: {str(e)}")
+                            for next_status in STATUS_TRANSITIONS.get(current_status, []):
+                                if st.button(STATUS_ACTIONS[next_status], key=f"{next_status}_{order['order_id']}"):
+                                    try:
+                                        success = update_order_status(order['order_id'], next_status)
+                                        if success:
+                                            st.success(f"Order moved to {STATUS_LABELS[next_status]}!")
+                                            st.rerun()
+                                        else:
+                                            st.error("Failed to update order.")
+                                    except Exception as e:
+                                        st.error(f"Error updating order: {str(e)}")
                         
                         st.divider()
             else:
                 st.info("🎉 No pending orders! All caught up.")
-            
-            # Note: Completed orders are automatically removed from the system
         else:
             st.info("📋 No orders yet. Waiting for customers...")
     
@@ -303,7 +483,7 @@ def admin_panel_page():
     st.header("⚙️ Admin Panel")
     
     # Create tabs for better organization
-    tab1, tab2, tab3 = st.tabs(["🍽️ Menu Management", "📦 Inventory Management", "📊 Order Statistics"])
+    tab1, tab2, tab3, tab4 = st.tabs(["🍽️ Menu Management", "📦 Inventory Management", "📊 Order Statistics", "⏱️ Kitchen Capacity"])
     
     with tab1:
         st.subheader("🍽️ Menu Management")
@@ -560,21 +740,14 @@ def admin_panel_page():
         st.subheader("📊 Order Statistics & Revenue")
         
         try:
-            orders = get_orders()
-            if orders:
-                # Calculate statistics
-                total_orders = len(orders)
-                total_revenue = 0
-                order_data = []
-                
-                for order_id, order in orders.items():
-                    if 'total_amount' in order:
-                        total_revenue += order['total_amount']
-                        order_data.append({
-                            'date': order['timestamp'][:10],
-                            'revenue': order['total_amount'],
-                            'customer': order['customer_name']
-                        })
+            # Statistics come straight from the fixed-width snapshot indexes, archive included; only displayed rows are decoded
+            snapshot = get_order_history()
+            if len(snapshot):
+                index = snapshot.index
+                total_orders = len(snapshot)
+                # Cancelled orders were never paid for
+                billed = ~snapshot.status_mask(["cancelled"])
+                total_revenue = float(index['total_amount'][billed].sum())
                 
                 # Display metrics
                 col1, col2, col3 = st.columns(3)
@@ -586,25 +759,48 @@ def admin_panel_page():
                     st.metric("Total Revenue", f"${total_revenue:.2f}")
                 
                 with col3:
-                    avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
+                    billed_orders = int(billed.sum())
+                    avg_order_value = total_revenue / billed_orders if billed_orders > 0 else 0
                     st.metric("Average Order Value", f"${avg_order_value:.2f}")
                 
                 # Revenue chart
-                if order_data:
+                dated = ~np.isnan(index['timestamp'])
+                if dated.any():
                     st.subheader("📈 Revenue Chart")
                     
                     # Group by date
-                    import pandas as pd
-                    df = pd.DataFrame(order_data)
-                    daily_revenue = df.groupby('date')['revenue'].sum().reset_index()
+                    charted = dated & billed
+                    dates = pd.to_datetime(index['timestamp'][charted], unit='s').strftime('%Y-%m-%d')
+                    daily_revenue = pd.Series(index['total_amount'][charted], index=dates).groupby(level=0).sum()
                     
                     # Create bar chart
-                    st.bar_chart(daily_revenue.set_index('date')['revenue'])
+                    st.bar_chart(daily_revenue)
                     
                     # Recent orders table
                     st.subheader("📋 Recent Orders")
+                    search_query = st.text_input("🔍 Search orders", placeholder="Customer name, item or instructions", key="admin_search")
+                    matching_ids = search_orders(search_query) if search_query.strip() else None
+                    
+                    if matching_ids is None:
+                        positions = np.arange(total_orders)
+                    else:
+                        order_positions = snapshot.positions()
+                        positions = np.array([order_positions[order_id] for order_id in matching_ids if order_id in order_positions], dtype=np.int64)
+                    
+                    # Sort by date (newest first)
+                    positions = positions[np.argsort(-index['timestamp'][positions], kind='stable')]
+                    
+                    # Show only last 10 orders unless searching, and cap search results
+                    if matching_ids is None:
+                        positions = positions[:10]
+                    elif len(positions) > MAX_SEARCH_RESULTS:
+                        st.caption(f"Showing the newest {MAX_SEARCH_RESULTS} of {len(positions)} matching orders; refine the search to narrow it down.")
+                        positions = positions[:MAX_SEARCH_RESULTS]
+                    
                     recent_orders = []
-                    for order_id, order_data in orders.items():
+                    for position in positions:
+                        order_id = snapshot.order_id(position)
+                        order_data = snapshot.record(position)
                         order_info = {
                             'Order ID': order_id[:8],
                             'Customer': order_data['customer_name'],
@@ -614,14 +810,10 @@ def admin_panel_page():
                         }
                         recent_orders.append(order_info)
                     
-                    # Sort by date (newest first)
-                    recent_orders.sort(key=lambda x: x['Date'], reverse=True)
-                    
-                    # Show only last 10 orders
-                    recent_orders = recent_orders[:10]
-                    
                     if recent_orders:
                         st.dataframe(recent_orders, use_container_width=True)
+                    elif matching_ids is not None:
+                        st.info(f"No orders match \"{search_query.strip()}\".")
                 else:
                     st.info("No revenue data available yet.")
             else:
@@ -630,9 +822,73 @@ def admin_panel_page():
         except Exception as e:
             st.error(f"Error loading order statistics: {str(e)}")
 
+    with tab4:
+        st.subheader("⏱️ Kitchen Capacity")
+        
+        try:
+            admission_settings = get_admission_settings()
+            kitchen_load = get_kitchen_load(admission_settings)
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Orders in Queue", kitchen_load['queued_orders'])
+            with col2:
+                st.metric("Queue Wait", f"{kitchen_load['queue_minutes']:.0f} min")
+            with col3:
+                st.metric("Parallel Orders", f"{kitchen_load['parallelism']:.1f}")
+            with col4:
+                st.metric("Measured Orders", kitchen_load['samples'])
+            
+            # Per-item throughput measured from in-progress to ready timestamps
+            menu_items = get_menu()
+            throughput = []
+            for item_name in menu_items:
+                unit_minutes = unit_minutes_for(kitchen_load, item_name)
+                throughput.append({
+                    'Item': item_name,
+                    'Queued': kitchen_load['queue_units'].get(item_name, 0),
+                    'Minutes per Unit': f"{unit_minutes:.1f}",
+                    'Units per Hour': f"{60 * kitchen_load['parallelism'] / unit_minutes:.0f}" if unit_minutes > 0 else "-",
+                    'Measured': "Yes" if item_name in kitchen_load['unit_minutes'] else "No"
+                })
+            if throughput:
+                st.dataframe(throughput, use_container_width=True)
+            
+            with st.form("admission_settings"):
+                col1, col2, col3 = st.columns(3)
+                
+                with col1:
+                    max_wait = st.number_input("Max Wait (min)", min_value=1.0, step=1.0, value=float(admission_settings['max_wait_minutes']))
+                
+                with col2:
+                    default_unit = st.number_input("Default Minutes per Unit", min_value=0.1, step=0.1, value=float(admission_settings['default_unit_minutes']))
+                
+                with col3:
+                    window = st.number_input("Measurement Window (min)", min_value=10, step=10, value=int(admission_settings['window_minutes']))
+                
+                paused_items = st.multiselect("Paused Items", list(menu_items), default=[item for item in admission_settings['paused_items'] if item in menu_items])
+                
+                if st.form_submit_button("💾 Save Settings", type="primary"):
+                    success = save_admission_settings({
+                        "max_wait_minutes": max_wait,
+                        "default_unit_minutes": default_unit,
+                        "window_minutes": int(window),
+                        "paused_items": paused_items
+                    })
+                    if success:
+                        st.success("Kitchen capacity settings saved!")
+                        st.rerun()
+                    else:
+                        st.error("Failed to save settings.")
+        
+        except Exception as e:
+            st.error(f"Error loading kitchen capacity: {str(e)}")
+
 # Page routing
 if page == "Customer Order":
     customer_order_page()
+elif page == "Order Status":
+    order_status_page()
 elif page == "Cook's View":
     cooks_view_page()
 elif page == "Admin Panel":
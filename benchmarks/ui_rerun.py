@@ -0,0 +1,334 @@
+"""Headless rerun benchmark for app.py using Streamlit's AppTest harness.
+
+Drives each page through scripted user flows against synthetic menu and
+order data in a scratch directory, and records wall time, script reruns
+and rendered element counts per flow. Compares against a saved baseline
+and exits non-zero when a flow regresses beyond the threshold. Wall time
+is divided by a calibration run of a trivial script on the same machine,
+so baselines recorded elsewhere stay comparable.
+
+Usage:
+    python benchmarks/ui_rerun.py                    # compare with baseline
+    python benchmarks/ui_rerun.py --update-baseline  # record a new baseline
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Callable, List
+from unittest import mock
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+APP_FILE = REPO_ROOT / "app.py"
+BASELINE_FILE = Path(__file__).resolve().parent / "ui_baseline.json"
+
+MOMO_NAMES = ["Chicken", "Veg", "Buff", "Paneer", "Pork", "Cheese", "Mushroom", "Corn", "Jhol", "Kothey", "Tandoori", "Chilli"]
+CUSTOMER_NAMES = ["Vansh", "Asha", "Bikash", "Priya", "Rohan", "Sita", "Anil", "Maya", "Kiran", "Deepa"]
+INSTRUCTIONS = ["", "", "extra mayo", "no onion", "extra spicy", "less oil", "pack separately"]
+
+def make_menu(menu_items: int) -> Dict[str, Any]:
+    """Synthetic menu in the current format"""
+    menu = {}
+    for idx in range(menu_items):
+        name = f"{MOMO_NAMES[idx % len(MOMO_NAMES)]} Momo" + (f" {idx // len(MOMO_NAMES) + 1}" if idx >= len(MOMO_NAMES) else "")
+        menu[name] = {"price": float(60 + 10 * (idx % 8)), "image": f"https://via.placeholder.com/200x150?text={idx}"}
+    return menu
+
+def make_orders(order_count: int, menu: Dict[str, Any], seed: int = 42) -> Dict[str, Any]:
+    """Synthetic orders spread over the last week across the lifecycle"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    menu_names = list(menu)
+    orders = {}
+    for _ in range(order_count):
+        items = []
+        for momo_type in rng.sample(menu_names, rng.randint(1, min(3, len(menu_names)))):
+            quantity = rng.randint(1, 4)
+            price = menu[momo_type]["price"]
+            items.append({"momo_type": momo_type, "quantity": quantity, "price": price, "total": price * quantity})
+        placed = now - timedelta(minutes=rng.randint(0, 7 * 24 * 60))
+        status = rng.choice(["pending", "pending", "in_progress", "ready", "picked_up"])
+        order = {
+            "customer_name": rng.choice(CUSTOMER_NAMES),
+            "items": items,
+            "special_instructions": rng.choice(INSTRUCTIONS),
+            "total_amount": sum(item["total"] for item in items),
+            "timestamp": placed.isoformat(),
+            "status": status
+        }
+        # Lifecycle timestamps so admission control has cook times to measure
+        if status != "pending":
+            started = placed + timedelta(minutes=rng.randint(1, 10))
+            order["in_progress_at"] = started.isoformat()
+            if status in ("ready", "picked_up"):
+                ready = started + timedelta(minutes=2 * sum(item["quantity"] for item in items) + rng.randint(0, 3))
+                order["ready_at"] = ready.isoformat()
+                if status == "picked_up":
+                    order["picked_up_at"] = (ready + timedelta(minutes=rng.randint(1, 15))).isoformat()
+        orders[str(uuid.UUID(int=rng.getrandbits(128)))] = order
+    return orders
+
+def write_dataset(directory: str, menu_items: int, order_count: int) -> None:
+    menu = make_menu(menu_items)
+    files = {
+        "menu.json": menu,
+        "orders.json": make_orders(order_count, menu),
+        "inventory.json": {"Flour": {"available": True, "quantity": 20}, "Oil": {"available": True, "quantity": 5}},
+        # The synthetic backlog is far beyond real capacity; keep every item orderable
+        # here and exercise the capped and paused UI in the customer_at_capacity flow
+        "admission.json": {"max_wait_minutes": 1e9}
+    }
+    for name, data in files.items():
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+def count_elements(node) -> int:
+    """Count rendered elements and blocks in an AppTest tree"""
+    children = getattr(node, "children", None)
+    if children is None:
+        return 1
+    return 1 + sum(count_elements(child) for child in children.values())
+
+def find_button(at: AppTest, label: str):
+    for button in at.button:
+        if button.label == label:
+            return button
+    raise LookupError(f"No button labelled {label!r}")
+
+# Each flow is a list of (step name, action) pairs; every action triggers a run
+def customer_order_flow(at: AppTest) -> List:
+    with open("menu.json", 'r', encoding='utf-8') as f:
+        first_item = next(iter(json.load(f)))
+    return [
+        ("open", lambda: at.sidebar.selectbox[0].select("Customer Order").run()),
+        ("increase_qty", lambda: at.button(key=f"inc_{first_item}").click().run()),
+        ("add_to_cart", lambda: at.button(key=f"add_{first_item}").click().run()),
+        ("enter_name", lambda: at.text_input[0].input("Bench Customer").run()),
+        ("submit", lambda: find_button(at, "🛒 Submit Order").click().run())
+    ]
+
+def set_realistic_limit() -> None:
+    """Allow a few more units of the first item over the current queue and pause the last one"""
+    from admission_control import ADMISSION_FILE, DEFAULT_SETTINGS, compute_kitchen_load, estimate_minutes
+
+    with open("menu.json", 'r', encoding='utf-8') as f:
+        menu_names = list(json.load(f))
+    settings = dict(DEFAULT_SETTINGS)
+    load = compute_kitchen_load(settings)
+    # Room for three and a half units, so three fit without rounding trouble
+    settings["max_wait_minutes"] = load["queue_minutes"] + estimate_minutes(load, {menu_names[0]: 3.5})
+    settings["paused_items"] = [menu_names[-1]]
+    with open(ADMISSION_FILE, 'w', encoding='utf-8') as f:
+        json.dump(settings, f)
+
+def customer_at_capacity_flow(at: AppTest) -> List:
+    with open("menu.json", 'r', encoding='utf-8') as f:
+        first_item = next(iter(json.load(f)))
+    return [
+        ("open", lambda: at.sidebar.selectbox[0].select("Customer Order").run()),
+        # The third click hits the cap and leaves the quantity unchanged
+        ("increase_qty", lambda: at.button(key=f"inc_{first_item}").click().run()),
+        ("increase_qty_again", lambda: at.button(key=f"inc_{first_item}").click().run()),
+        ("increase_past_cap", lambda: at.button(key=f"inc_{first_item}").click().run()),
+        # Filling the headroom pauses every item
+        ("add_to_cart", lambda: at.button(key=f"add_{first_item}").click().run()),
+        ("enter_name", lambda: at.text_input[0].input("Bench Customer").run()),
+        ("submit", lambda: find_button(at, "🛒 Submit Order").click().run())
+    ]
+
+def cooks_view_flow(at: AppTest) -> List:
+    def first_action():
+        # Move the first listed order on to its next status
+        order_id = next(box.key[len("select_"):] for box in at.checkbox if box.key and box.key.startswith("select_"))
+        keys = {button.key for button in at.button}
+        status = next(status for status in ("in_progress", "ready", "picked_up") if f"{status}_{order_id}" in keys)
+        return at.button(key=f"{status}_{order_id}").click().run()
+    return [
+        ("open", lambda: at.sidebar.selectbox[0].select("Cook's View").run()),
+        ("search", lambda: at.text_input(key="cook_search").input("mayo").run()),
+        ("clear_search", lambda: at.text_input(key="cook_search").input("").run()),
+        ("advance_order", first_action)
+    ]
+
+def admin_panel_flow(at: AppTest) -> List:
+    return [
+        ("open", lambda: at.sidebar.selectbox[0].select("Admin Panel").run()),
+        ("search", lambda: at.text_input(key="admin_search").input("Vansh").run())
+    ]
+
+def order_status_flow(at: AppTest) -> List:
+    return [
+        ("open", lambda: at.sidebar.selectbox[0].select("Order Status").run()),
+        ("poll", lambda: find_button(at, "🔄 Refresh Status").click().run())
+    ]
+
+FLOWS: Dict[str, Callable[[AppTest], List]] = {
+    "customer_order": customer_order_flow,
+    "customer_at_capacity": customer_at_capacity_flow,
+    "cooks_view": cooks_view_flow,
+    "admin_panel": admin_panel_flow,
+    "order_status": order_status_flow
+}
+
+# Extra data setup run inside the scratch directory before a flow starts
+SETUP: Dict[str, Callable[[], None]] = {
+    "customer_at_capacity": set_realistic_limit
+}
+
+def run_flow(flow: Callable[[AppTest], List], timeout: float) -> Dict[str, Any]:
+    """Run one flow in a fresh session, counting script executions per step"""
+    reruns = [0]
+    set_page_config = st.set_page_config
+
+    def counting_set_page_config(*args, **kwargs):
+        # app.py calls set_page_config exactly once per script run
+        reruns[0] += 1
+        return set_page_config(*args, **kwargs)
+
+    with mock.patch.object(st, "set_page_config", counting_set_page_config):
+        at = AppTest.from_file(str(APP_FILE), default_timeout=timeout)
+        at.run()
+        reruns[0] = 0
+        total_time = 0.0
+        for step, action in flow(at):
+            start = time.perf_counter()
+            action()
+            total_time += time.perf_counter() - start
+            if at.exception:
+                raise RuntimeError(f"Step {step} raised: {at.exception[0].value}")
+
+    return {
+        "wall_time": total_time,
+        "reruns": reruns[0],
+        "elements": count_elements(at.main) + count_elements(at.sidebar)
+    }
+
+# Trivial app timed alongside the flows to measure how fast this machine runs AppTest
+CALIBRATION_SCRIPT = """
+import streamlit as st
+st.title("Calibration")
+value = st.number_input("Value", value=1)
+for idx in range(20):
+    st.write(idx * value)
+"""
+
+def calibrate(repeat: int, timeout: float) -> float:
+    """Median seconds for a trivial app to run and rerun a few times"""
+    samples = []
+    # The first run pays one-off import costs; discard it
+    for _ in range(max(repeat, 3) + 1):
+        at = AppTest.from_string(CALIBRATION_SCRIPT, default_timeout=timeout)
+        start = time.perf_counter()
+        at.run()
+        for value in range(2, 5):
+            at.number_input[0].set_value(value).run()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples[1:])
+
+def run_benchmark(menu_items: int, order_count: int, repeat: int, timeout: float) -> Dict[str, Any]:
+    results = {}
+    cwd = os.getcwd()
+    for name, flow in FLOWS.items():
+        samples = []
+        # One untimed warm-up per flow, so lazily imported modules (e.g. chart
+        # libraries) do not land in whichever sample first needs them
+        for attempt in range(repeat + 1):
+            # Fresh data each time so writes made by a flow do not leak into the next sample
+            with tempfile.TemporaryDirectory() as directory:
+                write_dataset(directory, menu_items, order_count)
+                os.chdir(directory)
+                try:
+                    if name in SETUP:
+                        SETUP[name]()
+                    sample = run_flow(flow, timeout)
+                    if attempt:
+                        samples.append(sample)
+                finally:
+                    os.chdir(cwd)
+        results[name] = {
+            "wall_time": statistics.median(sample["wall_time"] for sample in samples),
+            "reruns": max(sample["reruns"] for sample in samples),
+            "elements": max(sample["elements"] for sample in samples)
+        }
+    return results
+
+def compare(results: Dict[str, Any], calibration: float, baseline: Dict[str, Any], threshold: float, time_threshold: float) -> List[str]:
+    """List metrics that exceed the baseline by more than their threshold ratio.
+
+    Reruns and elements are deterministic and gated tightly; wall time is
+    compared relative to each run's calibration and only flags gross slowdowns.
+    """
+    regressions = []
+    baseline_calibration = baseline.get("calibration")
+    for name, metrics in results.items():
+        expected = baseline.get("flows", {}).get(name)
+        if expected is None:
+            continue
+        for metric in ("reruns", "elements"):
+            limit = expected[metric] * (1 + threshold)
+            if metrics[metric] > limit:
+                regressions.append(f"{name}.{metric}: {metrics[metric]} > {limit:.1f} (baseline {expected[metric]})")
+        if baseline_calibration:
+            relative = metrics["wall_time"] / calibration
+            limit = expected["wall_time"] / baseline_calibration * (1 + time_threshold)
+            if relative > limit:
+                regressions.append(f"{name}.wall_time: {relative:.2f}x calibration > {limit:.2f}x (baseline {expected['wall_time'] / baseline_calibration:.2f}x)")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--menu-items", type=int, default=12)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed fractional increase in reruns and elements")
+    parser.add_argument("--time-threshold", type=float, default=1.0, help="allowed fractional increase in calibrated wall time")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-run AppTest timeout in seconds")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    calibration = calibrate(args.repeat, args.timeout)
+    results = run_benchmark(args.menu_items, args.orders, args.repeat, args.timeout)
+
+    print(f"calibration: {calibration:.3f}s")
+    print(f"{'flow':<22}{'wall time (s)':>15}{'relative':>10}{'reruns':>8}{'elements':>10}")
+    for name, metrics in results.items():
+        print(f"{name:<22}{metrics['wall_time']:>15.3f}{metrics['wall_time'] / calibration:>9.2f}x{metrics['reruns']:>8}{metrics['elements']:>10}")
+
+    if args.update_baseline:
+        baseline = {"menu_items": args.menu_items, "orders": args.orders, "calibration": calibration, "flows": results}
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_FILE}")
+        return 0
+
+    if not BASELINE_FILE.exists():
+        print("No baseline recorded; run with --update-baseline first.")
+        return 0
+
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if (baseline.get("menu_items"), baseline.get("orders")) != (args.menu_items, args.orders):
+        print("Baseline was recorded with a different data volume; skipping comparison.")
+        return 0
+
+    if not baseline.get("calibration"):
+        print("Baseline has no calibration; wall time is not compared.")
+    regressions = compare(results, calibration, baseline, args.threshold, args.time_threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import local_database
+from local_database import (
+    CHANGE_LOG_FILE,
+    ORDERS_FILE,
+    ARCHIVE_FILE,
+    MENU_FILE,
+    INVENTORY_FILE,
+    load_json_file,
+    save_json_file,
+    record_change,
+    enable_change_log,
+    get_file_signature,
+    get_all_orders
+)
+
+logger = logging.getLogger(__name__)
+
+# Byte offset into the change log that has been committed to the cloud
+CHECKPOINT_FILE = "sync_checkpoint.json"
+# Changes the backend refused, kept so they can be inspected and requeued
+DEAD_LETTER_FILE = "sync_dead_letter.jsonl"
+DATA_FILES = [ORDERS_FILE, ARCHIVE_FILE, MENU_FILE, INVENTORY_FILE]
+# Local contents of each replicated collection; archived orders stay in the cloud collection
+COLLECTION_LOADERS = {
+    "orders": get_all_orders,
+    "menu": lambda: load_json_file(MENU_FILE, {}),
+    "inventory": lambda: load_json_file(INVENTORY_FILE, {})
+}
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_SIZE = 500
+POLL_INTERVAL = 2.0
+INITIAL_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+# Firestore document ids are limited to 1500 bytes
+MAX_DOCUMENT_ID_BYTES = 1500
+
+def document_id(doc_id: str) -> str:
+    """Map a local key to a valid Firestore document id"""
+    # Escape the path separator reversibly, e.g. "Veg/Paneer Momo" -> "Veg%2FPaneer Momo"
+    escaped = doc_id.replace("%", "%25").replace("/", "%2F")
+    reserved = escaped in ("", ".", "..") or (escaped.startswith("__") and escaped.endswith("__"))
+    if reserved or len(escaped.encode('utf-8')) > MAX_DOCUMENT_ID_BYTES:
+        return "sha1_" + hashlib.sha1(doc_id.encode('utf-8')).hexdigest()
+    return escaped
+
+def local_key(doc_id: str) -> str:
+    """Inverse of document_id for escaped ids; hashed ids map to themselves"""
+    return doc_id.replace("%2F", "/").replace("%25", "%")
+
+def is_permanent_error(error: Exception) -> bool:
+    """Errors that retrying the same write can never fix"""
+    # The client validates paths and values locally and raises these
+    if isinstance(error, (ValueError, TypeError)):
+        return True
+    try:
+        from google.api_core import exceptions as api_exceptions
+    except ImportError:
+        return False
+    return isinstance(error, (api_exceptions.InvalidArgument, api_exceptions.FailedPrecondition))
+
+def _to_document(collection: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a local record as a Firestore document"""
+    # Old menu format stores a bare price
+    if collection == "menu" and not isinstance(data, dict):
+        return {"price": data}
+    return data
+
+def read_checkpoint() -> Dict[str, Any]:
+    """Get the replication checkpoint: log offset and, once caught up, data file signatures"""
+    return load_json_file(CHECKPOINT_FILE, {"offset": 0})
+
+def write_checkpoint(offset: int, signatures: Optional[Dict[str, Any]] = None) -> bool:
+    """Persist the last replicated change log offset"""
+    checkpoint = {"offset": offset}
+    if signatures is not None:
+        checkpoint["signatures"] = signatures
+    return save_json_file(CHECKPOINT_FILE, checkpoint)
+
+def data_file_signatures() -> Dict[str, Any]:
+    signatures = {}
+    for file_path in DATA_FILES:
+        signature = get_file_signature(file_path)
+        signatures[file_path] = list(signature) if signature else None
+    return signatures
+
+def seed_change_log() -> None:
+    """Journal the full local store so a fresh backend starts complete"""
+    for collection, load in COLLECTION_LOADERS.items():
+        for doc_id, data in load().items():
+            record_change(collection, doc_id, data)
+
+def reconcile_deletes(client) -> int:
+    """Journal deletes for cloud documents that no longer exist locally, returning how many"""
+    deleted = 0
+    for collection, load in COLLECTION_LOADERS.items():
+        expected = {document_id(key) for key in load()}
+        # list_documents fetches references only, not document contents
+        for doc_ref in client.collection(collection).list_documents():
+            if doc_ref.id not in expected:
+                record_change(collection, local_key(doc_ref.id), None)
+                deleted += 1
+    return deleted
+
+def read_changes(offset: int, limit: int = MAX_BATCH_SIZE) -> Tuple[List[Tuple[Dict[str, Any], int]], int]:
+    """Read up to limit complete changes after offset as (change, end offset) pairs, plus the new offset"""
+    changes = []
+    if not os.path.exists(CHANGE_LOG_FILE):
+        return changes, offset
+
+    with open(CHANGE_LOG_FILE, 'rb') as f:
+        f.seek(offset)
+        while len(changes) < limit:
+            line = f.readline()
+            # Stop at a partially written trailing line
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if line.strip():
+                changes.append((json.loads(line), offset))
+    return changes, offset
+
+def commit_changes(client, changes: List[Dict[str, Any]]) -> None:
+    """Apply changes to the backend in a single batched write"""
+    batch = client.batch()
+    for change in changes:
+        doc_ref = client.collection(change["collection"]).document(document_id(change["doc_id"]))
+        if change["data"] is None:
+            batch.delete(doc_ref)
+        else:
+            batch.set(doc_ref, _to_document(change["collection"], change["data"]))
+    batch.commit()
+
+def dead_letter(change: Dict[str, Any], error: Exception) -> None:
+    """Set aside a change the backend will not accept"""
+    logger.error(f"Dead-lettering {change['collection']}/{change['doc_id']}: {str(error)}")
+    with open(DEAD_LETTER_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({"change": change, "error": str(error)}, ensure_ascii=False) + "\n")
+
+def requeue_dead_letters() -> int:
+    """Journal the current local state of dead-lettered documents again, e.g. after fixing their data"""
+    if not os.path.exists(DEAD_LETTER_FILE):
+        return 0
+    with open(DEAD_LETTER_FILE, 'r', encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+
+    requeued, kept, current = set(), [], {}
+    for entry in entries:
+        collection, doc_id = entry["change"]["collection"], entry["change"]["doc_id"]
+        if collection not in COLLECTION_LOADERS:
+            kept.append(entry)
+            continue
+        if (collection, doc_id) in requeued:
+            continue
+        # The failed payload may be older than what has replicated since; send what is true now
+        if collection not in current:
+            current[collection] = COLLECTION_LOADERS[collection]()
+        record_change(collection, doc_id, current[collection].get(doc_id))
+        requeued.add((collection, doc_id))
+
+    if kept:
+        with open(DEAD_LETTER_FILE, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in kept)
+    else:
+        os.remove(DEAD_LETTER_FILE)
+    return len(requeued)
+
+def compact_change_log(offset: int) -> bool:
+    """Truncate the change log once everything up to offset is replicated"""
+    with local_database._change_log_lock:
+        if offset == 0 or not os.path.exists(CHANGE_LOG_FILE) or os.path.getsize(CHANGE_LOG_FILE) != offset:
+            return False
+        # Checkpoint first: a crash before truncation only replays idempotent writes.
+        # The signatures record the data files the cloud now matches, see start_replication.
+        if not write_checkpoint(0, data_file_signatures()):
+            return False
+        open(CHANGE_LOG_FILE, 'w').close()
+        return True
+
+class FirestoreReplicator(threading.Thread):
+    """Background thread that tails the change log and pushes batched writes"""
+
+    def __init__(self, client, poll_interval: float = POLL_INTERVAL, batch_size: int = MAX_BATCH_SIZE):
+        super().__init__(name="firestore-replicator", daemon=True)
+        self.client = client
+        self.poll_interval = poll_interval
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.stop_event = threading.Event()
+        self.last_error: Optional[str] = None
+        self.replicated_count = 0
+        self.dead_letter_count = 0
+        # Log offset up to which changes are sent one at a time after a failed batch
+        self.isolate_until: Optional[int] = None
+        # Set when the local store was re-seeded and documents deleted meanwhile must be removed
+        self.reconcile_pending = False
+
+    def sync_once(self) -> int:
+        """Replicate one batch of pending changes and return how many were handled"""
+        if self.reconcile_pending:
+            reconcile_deletes(self.client)
+            self.reconcile_pending = False
+
+        offset = int(read_checkpoint().get("offset", 0))
+        if os.path.exists(CHANGE_LOG_FILE) and offset > os.path.getsize(CHANGE_LOG_FILE):
+            # Log was compacted after the checkpoint was reset
+            offset = 0
+
+        changes, new_offset = read_changes(offset, self.batch_size)
+        if not changes:
+            compact_change_log(new_offset)
+            return 0
+
+        if self.isolate_until is None:
+            try:
+                commit_changes(self.client, [change for change, _ in changes])
+            except Exception:
+                # Retry this batch one change at a time so a bad change cannot block the rest
+                self.isolate_until = new_offset
+                raise
+            self.replicated_count += len(changes)
+            write_checkpoint(new_offset)
+            return len(changes)
+
+        handled = 0
+        for change, end_offset in changes:
+            if end_offset > self.isolate_until:
+                break
+            try:
+                commit_changes(self.client, [change])
+                self.replicated_count += 1
+            except Exception as e:
+                # Outages are retried with backoff for as long as they last
+                if not is_permanent_error(e):
+                    raise
+                dead_letter(change, e)
+                self.dead_letter_count += 1
+            write_checkpoint(end_offset)
+            handled += 1
+        if end_offset >= self.isolate_until:
+            self.isolate_until = None
+        return handled
+
+    def run(self) -> None:
+        backoff = INITIAL_BACKOFF
+        while not self.stop_event.is_set():
+            try:
+                sent = self.sync_once()
+                self.last_error = None
+                backoff = INITIAL_BACKOFF
+                if sent < self.batch_size:
+                    self.stop_event.wait(self.poll_interval)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Replication failed, retrying in {backoff:.1f}s: {str(e)}")
+                # Exponential backoff with jitter so restarts do not stampede the backend
+                self.stop_event.wait(backoff * random.uniform(0.5, 1.0))
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.stop_event.set()
+        self.join(timeout)
+
+def is_configured() -> bool:
+    """Check whether a Firestore project or emulator has been configured"""
+    return bool(
+        os.environ.get("FIRESTORE_EMULATOR_HOST")
+        or os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+        or os.environ.get("YUMMOZ_FIRESTORE_PROJECT")
+    )
+
+def create_firestore_client():
+    """Create a Firestore client; honours FIRESTORE_EMULATOR_HOST automatically"""
+    from google.cloud import firestore
+
+    project = os.environ.get("YUMMOZ_FIRESTORE_PROJECT")
+    return firestore.Client(project=project) if project else firestore.Client()
+
+def start_replication(client=None, poll_interval: float = POLL_INTERVAL) -> FirestoreReplicator:
+    """Enable change journaling and start the background replicator"""
+    if client is None:
+        client = create_firestore_client()
+
+    # Writes made while journaling was off (first run, or a run without cloud
+    # credentials) never reached the log; detect them by comparing the data files
+    # with the signatures recorded when the log was last fully replicated.
+    checkpoint = read_checkpoint() if os.path.exists(CHECKPOINT_FILE) else {"offset": 0}
+    enable_change_log()
+    reseeded = checkpoint.get("signatures") != data_file_signatures()
+    if reseeded:
+        seed_change_log()
+    # Retry anything set aside by an earlier run using the current local data
+    requeue_dead_letters()
+
+    replicator = FirestoreReplicator(client, poll_interval=poll_interval)
+    # Deletes made while journaling was off left documents behind in the cloud
+    replicator.reconcile_pending = reseeded
+    replicator.start()
+    return replicator
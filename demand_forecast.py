@@ -0,0 +1,264 @@
+import math
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from local_database import register_orders_cache
+from order_snapshot import SnapshotSet, get_order_history, wall_clock_seconds
+
+HOURS_PER_WEEK = 168
+# Hour 0 of the epoch (1970-01-01 00:00) fell on a Thursday; weeks start on Monday
+EPOCH_HOUR_OF_WEEK = 3 * 24
+PREP_WINDOW_HOURS = 1
+EVAL_WEEKS = 4
+
+def hour_of_week(hours: np.ndarray) -> np.ndarray:
+    """Monday-based hour of week (0-167) for absolute hours since the epoch"""
+    return (hours + EPOCH_HOUR_OF_WEEK) % HOURS_PER_WEEK
+
+def current_hour() -> float:
+    """Fractional absolute hour for the current wall-clock time"""
+    return wall_clock_seconds(datetime.now().isoformat()) / 3600
+
+class DemandModel:
+    """Hourly units per item built from order history, patched as orders are written.
+
+    Every order line is kept in flat row/hour/quantity arrays, with each order
+    owning a range of them, so that edits, deletes and orders with older
+    timestamps are applied exactly rather than only ever added.
+    """
+
+    def __init__(self):
+        self.items: List[str] = []
+        self.item_index: Dict[str, int] = {}
+        self.start_hour: Optional[int] = None
+        self.hourly = np.zeros((0, 0))
+        # Flat order lines; entries past size are spare capacity
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.hours = np.zeros(0, dtype=np.int64)
+        self.quantities = np.zeros(0)
+        self.size = 0
+        # order id -> (start, end) of its lines; ranges of edited or deleted orders become dead
+        self.spans: Dict[str, Tuple[int, int]] = {}
+        self.dead = 0
+        # Re-entrant so readers can hold it across weekly_view while writers patch the matrix
+        self.lock = threading.RLock()
+
+    def build(self, orders: Dict[str, Any]) -> None:
+        """Rebuild the matrix from every order"""
+        with self.lock:
+            self.items, self.item_index = [], {}
+            self.start_hour, self.hourly = None, np.zeros((0, 0))
+            self.spans, rows, hours, quantities = self._flatten(orders)
+            self.rows, self.hours, self.quantities = rows, hours, quantities
+            self.size, self.dead = len(rows), 0
+            if self.size:
+                self._add(rows, hours, quantities)
+
+    def apply(self, order_id: str, order: Optional[Dict[str, Any]]) -> None:
+        """Replace one order's contribution; order is None when it was deleted"""
+        with self.lock:
+            spans, rows, hours, quantities = self._flatten({order_id: order} if order is not None else {})
+            previous = self.spans.pop(order_id, None)
+            if previous is not None:
+                start, end = previous
+                if (np.array_equal(self.rows[start:end], rows) and np.array_equal(self.hours[start:end], hours)
+                        and np.array_equal(self.quantities[start:end], quantities)):
+                    # Status changes leave the units as they were
+                    self.spans[order_id] = previous
+                    return
+                self._add(self.rows[start:end], self.hours[start:end], -self.quantities[start:end])
+                self.dead += end - start
+            if len(rows):
+                self.spans[order_id] = (self.size, self.size + len(rows))
+                self._append(rows, hours, quantities)
+                self._add(rows, hours, quantities)
+            if self.dead > self.size // 2:
+                self._compact()
+
+    def _flatten(self, orders: Dict[str, Any]) -> Tuple[Dict[str, Tuple[int, int]], np.ndarray, np.ndarray, np.ndarray]:
+        """One pass over every order line into (spans, item rows, absolute hours, quantities)"""
+        spans, rows, hours, quantities = {}, [], [], []
+        for order_id, order in orders.items():
+            seconds = wall_clock_seconds(order.get('timestamp'))
+            lines = order['items'] if 'items' in order else [order]
+            if math.isnan(seconds) or not lines:
+                continue
+            start = len(rows)
+            for line in lines:
+                item = line.get('momo_type', 'Unknown')
+                if item not in self.item_index:
+                    self.item_index[item] = len(self.items)
+                    self.items.append(item)
+                rows.append(self.item_index[item])
+                quantities.append(line.get('quantity', 1))
+            hours.extend([int(seconds // 3600)] * len(lines))
+            spans[order_id] = (start, len(rows))
+        return (spans, np.array(rows, dtype=np.int64), np.array(hours, dtype=np.int64),
+                np.array(quantities, dtype=float))
+
+    def _append(self, rows: np.ndarray, hours: np.ndarray, quantities: np.ndarray) -> None:
+        end = self.size + len(rows)
+        if end > len(self.rows):
+            # Double the capacity so appends stay amortized O(1)
+            capacity = max(end, 2 * len(self.rows))
+            self.rows, self.hours, self.quantities = (
+                np.resize(array[:self.size], capacity) for array in (self.rows, self.hours, self.quantities))
+        self.rows[self.size:end], self.hours[self.size:end], self.quantities[self.size:end] = rows, hours, quantities
+        self.size = end
+
+    def _compact(self) -> None:
+        """Drop the lines of edited and deleted orders, shifting the live ranges down"""
+        live = np.zeros(self.size, dtype=bool)
+        for start, end in self.spans.values():
+            live[start:end] = True
+        dead_before = np.cumsum(~live)
+        self.spans = {order_id: (start - int(dead_before[start]), end - int(dead_before[start]))
+                      for order_id, (start, end) in self.spans.items()}
+        self.rows, self.hours, self.quantities = (
+            array[:self.size][live] for array in (self.rows, self.hours, self.quantities))
+        self.size, self.dead = len(self.rows), 0
+
+    def _add(self, rows: np.ndarray, hours: np.ndarray, quantities: np.ndarray) -> None:
+        first = int(hours.min())
+        if self.start_hour is None:
+            self.start_hour = first
+        elif first < self.start_hour:
+            # Older orders than we have seen: grow the matrix to the left
+            self.hourly = np.pad(self.hourly, ((0, 0), (self.start_hour - first, 0)))
+            self.start_hour = first
+        columns = hours - self.start_hour
+        self._grow(len(self.items), int(columns.max()) + 1)
+        np.add.at(self.hourly, (rows, columns), quantities)
+
+    def _grow(self, rows: int, columns: int) -> None:
+        pad_rows = max(0, rows - self.hourly.shape[0])
+        pad_columns = max(0, columns - self.hourly.shape[1])
+        if pad_rows or pad_columns:
+            self.hourly = np.pad(self.hourly, ((0, pad_rows), (0, pad_columns)))
+
+    def weekly_view(self, end_hour: int) -> np.ndarray:
+        """Complete hours before end_hour reshaped to (items, weeks, 168); NaN where no history exists"""
+        with self.lock:
+            if self.start_hour is None or end_hour <= self.start_hour:
+                return np.full((len(self.items), 0, HOURS_PER_WEEK), np.nan)
+            span = end_hour - self.start_hour
+            history = np.zeros((len(self.items), span))
+            available = min(span, self.hourly.shape[1])
+            history[:, :available] = self.hourly[:, :available]
+
+            lead = int(hour_of_week(np.int64(self.start_hour)))
+            trail = -(lead + span) % HOURS_PER_WEEK
+            padded = np.pad(history, ((0, 0), (lead, trail)), constant_values=np.nan)
+            return padded.reshape(len(self.items), -1, HOURS_PER_WEEK)
+
+    def profiles(self, end_hour: int) -> np.ndarray:
+        """Mean units per hour of week for every item, shape (items, 168)"""
+        weekly = self.weekly_view(end_hour)
+        observed = (~np.isnan(weekly)).sum(axis=1)
+        totals = np.nansum(weekly, axis=1)
+        return np.divide(totals, observed, out=np.zeros_like(totals), where=observed > 0)
+
+    def forecast(self, now_hour: float, window_hours: int = PREP_WINDOW_HOURS) -> Dict[str, float]:
+        """Expected units per item from now until the end of the window"""
+        with self.lock:
+            if not self.items:
+                return {}
+            hour = int(now_hour)
+            profiles = self.profiles(hour)
+            # Remainder of the current hour plus the following window
+            weights = np.ones(window_hours + 1)
+            weights[0] = 1 - (now_hour - hour)
+            buckets = hour_of_week(np.arange(hour, hour + window_hours + 1))
+            expected = profiles[:, buckets] @ weights
+            return dict(zip(self.items, expected.tolist()))
+
+    def backtest(self, now_hour: float, eval_weeks: int = EVAL_WEEKS) -> Dict[str, Any]:
+        """Score hour-of-week forecasts made only from earlier weeks against what happened"""
+        with self.lock:
+            weekly = self.weekly_view(int(now_hour))
+            valid = ~np.isnan(weekly)
+            values = np.nan_to_num(weekly)
+            prior_totals = np.cumsum(values, axis=1) - values
+            prior_counts = np.cumsum(valid, axis=1) - valid
+            predicted = np.divide(prior_totals, prior_counts, out=np.full_like(values, np.nan), where=prior_counts > 0)
+
+            # Same hour last week, the baseline the profile has to beat
+            baseline = np.full_like(weekly, np.nan)
+            baseline[:, 1:, :] = weekly[:, :-1, :]
+
+            scored = valid & (prior_counts > 0) & ~np.isnan(baseline)
+            scored[:, :-eval_weeks, :] = False
+            hours_scored = int(scored[0].sum()) if len(self.items) else 0
+            if not hours_scored:
+                return {"hours": 0, "mae": None, "baseline_mae": None, "wape": None, "item_mae": {}}
+
+            errors = np.where(scored, np.abs(predicted - weekly), 0.0)
+            baseline_errors = np.where(scored, np.abs(baseline - weekly), 0.0)
+            actual = np.where(scored, weekly, 0.0).sum()
+            item_mae = errors.sum(axis=(1, 2)) / hours_scored
+            return {
+                "hours": hours_scored,
+                "mae": float(errors.sum() / hours_scored),
+                "baseline_mae": float(baseline_errors.sum() / hours_scored),
+                "wape": float(errors.sum() / actual) if actual > 0 else None,
+                "item_mae": dict(zip(self.items, item_mae.tolist()))
+            }
+
+def time_to_serve(snapshot: SnapshotSet, now_hour: float, days: int = 7) -> Dict[str, Optional[float]]:
+    """Mean minutes from order to ready over the last period and the one before it"""
+    now_seconds = now_hour * 3600
+    period = days * 86400
+    placed = snapshot.index['timestamp']
+    minutes = (snapshot.index['ready_at'] - placed) / 60
+    served = ~np.isnan(minutes) & (placed >= now_seconds - 2 * period)
+    current = served & (placed >= now_seconds - period)
+    previous = served & ~current
+    return {
+        "current": float(minutes[current].mean()) if current.any() else None,
+        "previous": float(minutes[previous].mean()) if previous.any() else None
+    }
+
+# One model per server process, shared by all sessions
+_model = DemandModel()
+_model_cache = register_orders_cache(_model.build, _model.apply)
+
+def get_demand_model() -> DemandModel:
+    """Get the shared model, rebuilt only if orders.json was changed outside this process"""
+    _model_cache.refresh()
+    return _model
+
+def prep_ahead(queued_units: Dict[str, int], item_names: List[str], window_hours: int = PREP_WINDOW_HOURS) -> List[Dict[str, Any]]:
+    """Recommend units to prepare ahead for the coming window, net of what is already queued"""
+    model = get_demand_model()
+    expected = model.forecast(current_hour(), window_hours)
+    recommendations = []
+    for item_name in item_names:
+        units = expected.get(item_name, 0.0)
+        queued = queued_units.get(item_name, 0)
+        suggested = max(0, round(units - queued))
+        if suggested > 0:
+            recommendations.append({"item": item_name, "expected": units, "queued": queued, "suggested": suggested})
+    recommendations.sort(key=lambda rec: rec["suggested"], reverse=True)
+    return recommendations
+
+# The report only changes when orders do or the hour rolls over
+_report_cache: Dict[str, Any] = {}
+_report_lock = threading.Lock()
+
+def forecast_report(eval_weeks: int = EVAL_WEEKS) -> Dict[str, Any]:
+    """Forecast accuracy over recent weeks plus the time-to-serve trend"""
+    snapshot = get_order_history()
+    now_hour = current_hour()
+    key = (snapshot.source_signature, int(now_hour), eval_weeks)
+    with _report_lock:
+        if _report_cache.get("key") != key:
+            model = get_demand_model()
+            report = model.backtest(now_hour, eval_weeks)
+            report["time_to_serve"] = time_to_serve(snapshot, now_hour)
+            report["history_weeks"] = model.weekly_view(int(now_hour)).shape[1]
+            _report_cache["report"] = report
+            _report_cache["key"] = key
+        return _report_cache["report"]
@@ -1,14 +1,51 @@
 import json
+import logging
 import os
+import threading
 import uuid
-from datetime import datetime
-from typing import Dict, Any, Optional
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Callable, List, Tuple
 import streamlit as st
 
+from order_snapshot import ARCHIVE_SNAPSHOT_FILE, SNAPSHOT_FILE, publish_snapshot, write_lock
+
+logger = logging.getLogger(__name__)
+
 # Database file paths in root directory
 ORDERS_FILE = "orders.json"
 MENU_FILE = "menu.json"
 INVENTORY_FILE = "inventory.json"
+# Picked-up and cancelled orders move here once old, so orders.json only holds recent ones
+ARCHIVE_FILE = "orders_archive.json"
+
+# Append-only journal of document changes, tailed by cloud_sync
+CHANGE_LOG_FILE = "sync_log.jsonl"
+
+_change_log_lock = threading.Lock()
+_change_log_enabled = False
+
+# Serializes read-modify-write of orders.json with its snapshot publish across sessions;
+# shared with order_snapshot so its rebuilds wait for a write in flight
+_orders_lock = write_lock
+
+def enable_change_log() -> None:
+    """Start journaling order/menu/inventory changes for replication"""
+    global _change_log_enabled
+    _change_log_enabled = True
+
+def record_change(collection: str, doc_id: str, data: Optional[Dict[str, Any]]) -> None:
+    """Append a change to the journal; data is None for deletes"""
+    if not _change_log_enabled:
+        return
+    
+    entry = {"collection": collection, "doc_id": doc_id, "data": data}
+    try:
+        with _change_log_lock:
+            with open(CHANGE_LOG_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except Exception as e:
+        # Journaling must never block or fail a local write
+        logger.warning(f"Error recording change for {collection}/{doc_id}: {str(e)}")
 
 def load_json_file(file_path: str, default_data: Dict = None) -> Dict:
     """Load JSON file with fallback to default data"""
@@ -31,52 +68,215 @@ def load_json_file(file_path: str, default_data: Dict = None) -> Dict:
 def save_json_file(file_path: str, data: Dict) -> bool:
     """Save data to JSON file"""
     
+    # Write aside and swap in, so readers never see a half-written file
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
         return True
     except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
         st.error(f"Error saving {file_path}: {str(e)}")
         return False
 
+def get_file_signature(file_path: str) -> Optional[Tuple[int, int]]:
+    """Get (mtime, size) of a file so in-memory caches can detect outside writes"""
+    try:
+        stat = os.stat(file_path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def _orders_signature() -> Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]:
+    return (get_file_signature(ORDERS_FILE), get_file_signature(ARCHIVE_FILE))
+
+class OrdersCache:
+    """In-memory structure derived from all orders, patched by this process's own writes.
+
+    build(orders) loads everything, archived orders included; apply(order_id, order)
+    applies one change, with order None for deletes. Outside writes and archiving
+    are caught by the file signatures.
+    """
+
+    def __init__(self, build: Callable[[Dict[str, Any]], None], apply: Callable[[str, Optional[Dict[str, Any]]], None]):
+        self.build = build
+        self.apply = apply
+        self.signature: Optional[Tuple] = None
+        self.lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """Rebuild from disk if the order files differ from what the cache reflects"""
+        with self.lock:
+            signature = _orders_signature()
+            if self.signature is None or signature != self.signature:
+                self.build(get_all_orders())
+                self.signature = signature
+
+    def on_write(self, before: Tuple, after: Tuple, changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Apply a write's changes, or mark the cache stale if the file had moved on without us"""
+        with self.lock:
+            if self.signature is None:
+                # Not built yet; the first read builds from disk
+                return
+            if self.signature != before:
+                # The order files were written elsewhere since we last loaded them
+                self.signature = None
+                return
+            for order_id, order in changes.items():
+                self.apply(order_id, order)
+            self.signature = after
+
+_orders_caches: List[OrdersCache] = []
+
+def register_orders_cache(build: Callable[[Dict[str, Any]], None], apply: Callable[[str, Optional[Dict[str, Any]]], None]) -> OrdersCache:
+    """Create a cache that save_orders_file keeps in step with local writes"""
+    cache = OrdersCache(build, apply)
+    _orders_caches.append(cache)
+    return cache
+
+# Order lifecycle: pending -> in_progress -> ready -> picked_up, cancellable until picked up
+ORDER_STATUSES = ["pending", "in_progress", "ready", "picked_up", "cancelled"]
+ACTIVE_STATUSES = ["pending", "in_progress", "ready"]
+STATUS_TRANSITIONS = {
+    "pending": ["in_progress", "cancelled"],
+    "in_progress": ["ready", "cancelled"],
+    "ready": ["picked_up", "cancelled"],
+    "picked_up": [],
+    "cancelled": [],
+    # Orders marked completed before the lifecycle existed
+    "completed": []
+}
+
+TERMINAL_STATUSES = [status for status, next_statuses in STATUS_TRANSITIONS.items() if not next_statuses]
+
+# Terminal orders older than this are archived, in batches so the archive is rarely rewritten
+ARCHIVE_AFTER_HOURS = 24
+ARCHIVE_BATCH_SIZE = 200
+
+def can_transition(current_status: str, new_status: str) -> bool:
+    """Check whether an order may move from current_status to new_status"""
+    return new_status in STATUS_TRANSITIONS.get(current_status, [])
+
+def archive_orders(orders: Dict[str, Any]) -> List[str]:
+    """Move old terminal orders out of orders (in place) into the archive file.
+
+    Call with _orders_lock held and save orders.json afterwards; returns the moved ids.
+    The archive is written first, so a crash in between leaves a duplicate, never a loss.
+    """
+    cutoff = (datetime.now() - timedelta(hours=ARCHIVE_AFTER_HOURS)).isoformat()
+    old_ids = [
+        order_id for order_id, order in orders.items()
+        if order.get('status', 'pending') in TERMINAL_STATUSES and order.get('timestamp', '') < cutoff
+    ]
+    if not old_ids or len(old_ids) < ARCHIVE_BATCH_SIZE:
+        return []
+
+    archive = load_json_file(ARCHIVE_FILE, {})
+    for order_id in old_ids:
+        archive[order_id] = orders.pop(order_id)
+    if not save_json_file(ARCHIVE_FILE, archive):
+        orders.update((order_id, archive[order_id]) for order_id in old_ids)
+        return []
+    try:
+        publish_snapshot(archive, ARCHIVE_SNAPSHOT_FILE, ARCHIVE_FILE, get_file_signature(ARCHIVE_FILE))
+    except Exception as e:
+        logger.warning(f"Error publishing archive snapshot: {str(e)}")
+    return old_ids
+
+def save_orders_file(orders: Dict[str, Any], changes: Dict[str, Optional[Dict[str, Any]]]) -> bool:
+    """Save all orders, update in-memory caches with the changed orders and publish the shared read snapshot"""
+    with _orders_lock:
+        before = _orders_signature()
+        if not save_json_file(ORDERS_FILE, orders):
+            return False
+        # Taken right after the write, so the snapshot is tagged with exactly this version
+        after = _orders_signature()
+        for cache in _orders_caches:
+            cache.on_write(before, after, changes)
+        try:
+            publish_snapshot(orders, SNAPSHOT_FILE, ORDERS_FILE, after[0])
+        except Exception as e:
+            # Readers rebuild a stale snapshot from orders.json on their own
+            logger.warning(f"Error publishing order snapshot: {str(e)}")
+        return True
+
 # Order operations
-def save_order(order_data: Dict[str, Any]) -> bool:
-    """Save order to local JSON database"""
+def save_order(order_data: Dict[str, Any]) -> Optional[str]:
+    """Save order to local JSON database and return its id"""
     try:
-        orders = load_json_file(ORDERS_FILE, {})
-        order_id = str(uuid.uuid4())
-        orders[order_id] = order_data
-        return save_json_file(ORDERS_FILE, orders)
+        with _orders_lock:
+            orders = load_json_file(ORDERS_FILE, {})
+            order_id = str(uuid.uuid4())
+            orders[order_id] = order_data
+            if save_orders_file(orders, {order_id: order_data}):
+                record_change("orders", order_id, order_data)
+                return order_id
+            return None
     except Exception as e:
         st.error(f"Error saving order: {str(e)}")
-        return False
+        return None
 
 def get_orders() -> Dict[str, Any]:
-    """Get all orders from local JSON database"""
+    """Get current orders from local JSON database; old finished ones are in the archive"""
     return load_json_file(ORDERS_FILE, {})
 
-def update_order_status(order_id: str, status: str) -> bool:
-    """Update order status in local JSON database"""
+def get_all_orders() -> Dict[str, Any]:
+    """Get archived and current orders together"""
+    orders = load_json_file(ARCHIVE_FILE, {}) if os.path.exists(ARCHIVE_FILE) else {}
+    orders.update(get_orders())
+    return orders
+
+def transition_orders(order_ids: List[str], status: str) -> int:
+    """Move several orders to a new status in one write, returning how many changed"""
+    if status not in ORDER_STATUSES:
+        st.error(f"Unknown order status: {status}")
+        return 0
+    
     try:
-        orders = load_json_file(ORDERS_FILE, {})
-        if order_id in orders:
-            orders[order_id]['status'] = status
-            if status == 'completed':
-                orders[order_id]['completed_at'] = datetime.now().isoformat()
-            return save_json_file(ORDERS_FILE, orders)
-        return False
+        with _orders_lock:
+            orders = load_json_file(ORDERS_FILE, {})
+            now = datetime.now().isoformat()
+            changed = []
+            for order_id in order_ids:
+                order = orders.get(order_id)
+                if order is None or not can_transition(order.get('status', 'pending'), status):
+                    continue
+                order['status'] = status
+                order[f'{status}_at'] = now
+                changed.append(order_id)
+        
+            if not changed:
+                return 0
+            updates = {order_id: orders[order_id] for order_id in changed}
+            # Finishing orders is when old ones pile up; keep orders.json to recent history
+            if status in TERMINAL_STATUSES:
+                archive_orders(orders)
+            if not save_orders_file(orders, updates):
+                return 0
+            for order_id in changed:
+                record_change("orders", order_id, updates[order_id])
+            return len(changed)
     except Exception as e:
         st.error(f"Error updating order status: {str(e)}")
-        return False
+        return 0
+
+def update_order_status(order_id: str, status: str) -> bool:
+    """Update order status in local JSON database"""
+    return transition_orders([order_id], status) == 1
 
 def delete_order(order_id: str) -> bool:
     """Delete order from local JSON database"""
     try:
-        orders = load_json_file(ORDERS_FILE, {})
-        if order_id in orders:
-            del orders[order_id]
-            return save_json_file(ORDERS_FILE, orders)
-        return False
+        with _orders_lock:
+            orders = load_json_file(ORDERS_FILE, {})
+            if order_id in orders:
+                del orders[order_id]
+                if save_orders_file(orders, {order_id: None}):
+                    record_change("orders", order_id, None)
+                    return True
+            return False
     except Exception as e:
         st.error(f"Error deleting order: {str(e)}")
         return False
@@ -91,7 +291,10 @@ def save_menu_item(item_name: str, price: float, image_url: str = None) -> bool:
             image_url = f"https://via.placeholder.com/200x150/FF6B6B/FFFFFF?text={item_name.replace(' ', '%20')}"
         
         menu[item_name] = {"price": price, "image": image_url}
-        return save_json_file(MENU_FILE, menu)
+        if save_json_file(MENU_FILE, menu):
+            record_change("menu", item_name, menu[item_name])
+            return True
+        return False
     except Exception as e:
         st.error(f"Error saving menu item: {str(e)}")
         return False
@@ -112,7 +315,9 @@ def delete_menu_item(item_name: str) -> bool:
         menu = load_json_file(MENU_FILE, {})
         if item_name in menu:
             del menu[item_name]
-            return save_json_file(MENU_FILE, menu)
+            if save_json_file(MENU_FILE, menu):
+                record_change("menu", item_name, None)
+                return True
         return False
     except Exception as e:
         st.error(f"Error deleting menu item: {str(e)}")
@@ -122,7 +327,18 @@ def delete_menu_item(item_name: str) -> bool:
 def save_inventory(inventory_data: Dict[str, Any]) -> bool:
     """Save inventory data to local JSON database"""
     try:
-        return save_json_file(INVENTORY_FILE, inventory_data)
+        previous = load_json_file(INVENTORY_FILE, {}) if _change_log_enabled else {}
+        if not save_json_file(INVENTORY_FILE, inventory_data):
+            return False
+        
+        # Journal only the items that actually changed
+        for item_name, details in inventory_data.items():
+            if previous.get(item_name) != details:
+                record_change("inventory", item_name, details)
+        for item_name in previous:
+            if item_name not in inventory_data:
+                record_change("inventory", item_name, None)
+        return True
     except Exception as e:
         st.error(f"Error saving inventory: {str(e)}")
         return False
@@ -142,7 +358,7 @@ def get_inventory() -> Dict[str, Any]:
 def get_order_statistics() -> Dict[str, Any]:
     """Get order statistics from local JSON database"""
     try:
-        orders = get_orders()
+        orders = get_all_orders()
         if not orders:
             return {}
         
@@ -157,9 +373,12 @@ def get_order_statistics() -> Dict[str, Any]:
         menu = get_menu()
         
         for order in orders.values():
-            if order.get('status') == 'completed':
+            if order.get('status') == 'cancelled':
+                # Cancelled orders are neither sold nor pending
+                continue
+            if order.get('status') in ('completed', 'picked_up'):
                 stats['completed_orders'] += 1
-            else:
+            elif order.get('status', 'pending') in ACTIVE_STATUSES:
                 stats['pending_orders'] += 1
             
             momo_type = order.get('momo_type', 'Unknown')
@@ -0,0 +1,118 @@
+import bisect
+import re
+import threading
+from typing import Dict, Any, List, Optional, Set
+
+from local_database import register_orders_cache
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+def order_tokens(order: Dict[str, Any]) -> Set[str]:
+    """Collect searchable tokens from customer name, items and special instructions"""
+    tokens = set(tokenize(order.get('customer_name', '')))
+    tokens.update(tokenize(order.get('special_instructions', '')))
+    if 'items' in order:
+        for item in order['items']:
+            tokens.update(tokenize(item.get('momo_type', '')))
+    else:
+        # Handle old order format
+        tokens.update(tokenize(order.get('momo_type', '')))
+    return tokens
+
+class OrderSearchIndex:
+    """Inverted index from token to order ids, with prefix lookup over a sorted vocabulary"""
+
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+        self.vocabulary: List[str] = []
+        self.doc_tokens: Dict[str, Set[str]] = {}
+        self.lock = threading.Lock()
+
+    def build(self, orders: Dict[str, Any]) -> None:
+        with self.lock:
+            self.postings = {}
+            self.doc_tokens = {}
+            for order_id, order in orders.items():
+                tokens = order_tokens(order)
+                self.doc_tokens[order_id] = tokens
+                for token in tokens:
+                    self.postings.setdefault(token, set()).add(order_id)
+            self.vocabulary = sorted(self.postings)
+
+    def add(self, order_id: str, order: Dict[str, Any]) -> None:
+        with self.lock:
+            self._remove(order_id)
+            tokens = order_tokens(order)
+            self.doc_tokens[order_id] = tokens
+            for token in tokens:
+                if token not in self.postings:
+                    self.postings[token] = set()
+                    bisect.insort(self.vocabulary, token)
+                self.postings[token].add(order_id)
+
+    def remove(self, order_id: str) -> None:
+        with self.lock:
+            self._remove(order_id)
+
+    def _remove(self, order_id: str) -> None:
+        for token in self.doc_tokens.pop(order_id, ()):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.discard(order_id)
+            if not posting:
+                del self.postings[token]
+                idx = bisect.bisect_left(self.vocabulary, token)
+                if idx < len(self.vocabulary) and self.vocabulary[idx] == token:
+                    del self.vocabulary[idx]
+
+    def _prefix_matches(self, prefix: str) -> Set[str]:
+        # Exact tokens are the common case and need no vocabulary scan
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\uffff", start)
+        if end - start == 1:
+            return self.postings[self.vocabulary[start]]
+        matches: Set[str] = set()
+        for token in self.vocabulary[start:end]:
+            matches |= self.postings[token]
+        return matches
+
+    def search(self, query: str) -> Set[str]:
+        """Return ids of orders matching every query word as a prefix"""
+        words = tokenize(query)
+        if not words:
+            return set()
+        with self.lock:
+            candidates = sorted((self._prefix_matches(word) for word in set(words)), key=len)
+            result = set(candidates[0])
+            for posting in candidates[1:]:
+                if not result:
+                    break
+                result &= posting
+            return result
+
+    def __len__(self) -> int:
+        return len(self.doc_tokens)
+
+def _apply_change(order_id: str, order: Optional[Dict[str, Any]]) -> None:
+    if order is None:
+        _index.remove(order_id)
+    else:
+        _index.add(order_id, order)
+
+# One index per server process, shared by all sessions
+_index = OrderSearchIndex()
+_index_cache = register_orders_cache(_index.build, _apply_change)
+
+def get_search_index() -> OrderSearchIndex:
+    """Get the shared index, rebuilding it if orders.json was changed outside this process"""
+    _index_cache.refresh()
+    return _index
+
+def search_orders(query: str) -> Set[str]:
+    """Get ids of orders whose name, items or instructions match the query"""
+    return get_search_index().search(query)
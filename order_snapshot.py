@@ -0,0 +1,236 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+# Immutable, memory-mapped copy of orders.json published after every commit.
+# Layout: header | fixed-width index (one entry per order) | records
+# Each record is the order id followed by its JSON, located by the index entry.
+SNAPSHOT_FILE = "orders.snapshot"
+SOURCE_FILE = "orders.json"
+# Old picked-up and cancelled orders, moved out of orders.json by local_database
+ARCHIVE_SNAPSHOT_FILE = "orders_archive.snapshot"
+ARCHIVE_SOURCE_FILE = "orders_archive.json"
+
+MAGIC = b"YMOSNAP2"
+HEADER = struct.Struct("<8sQqq")  # magic, count, source mtime_ns, source size
+INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("id_length", "<u2"),
+    ("status", "u1"),
+    ("reserved", "u1"),
+    ("total_amount", "<f8"),
+    ("timestamp", "<f8"),
+    ("ready_at", "<f8")  # NaN until the order is marked ready
+])
+
+# Status codes stored in the index; anything else is UNKNOWN_STATUS
+STATUS_CODES = ["pending", "in_progress", "ready", "picked_up", "cancelled", "completed"]
+UNKNOWN_STATUS = 255
+
+def _status_code(status: str) -> int:
+    return STATUS_CODES.index(status) if status in STATUS_CODES else UNKNOWN_STATUS
+
+def wall_clock_seconds(timestamp: str) -> float:
+    """Seconds since 1970 of the order's wall-clock time, so dates round-trip unchanged"""
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return float("nan")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+def _source_signature(source_file: str) -> Tuple[int, int]:
+    try:
+        stat = os.stat(source_file)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return (-1, -1)
+
+def publish_snapshot(orders: Dict[str, Any], path: str = SNAPSHOT_FILE, source_file: str = SOURCE_FILE,
+                     source_signature: Optional[Tuple[int, int]] = None) -> None:
+    """Write a new snapshot and atomically replace the old one; open readers keep their mapping.
+
+    source_signature is the (mtime_ns, size) of source_file as it was when orders
+    was written or read; stat-ing here instead could pick up a later write.
+    """
+    index = np.zeros(len(orders), dtype=INDEX_DTYPE)
+    records = []
+    offset = HEADER.size + index.nbytes
+    for i, (order_id, order) in enumerate(orders.items()):
+        id_bytes = order_id.encode('utf-8')
+        body = json.dumps(order, ensure_ascii=False).encode('utf-8')
+        index[i] = (
+            offset,
+            len(body),
+            len(id_bytes),
+            _status_code(order.get('status', 'pending')),
+            0,
+            float(order.get('total_amount', 0) or 0),
+            wall_clock_seconds(order.get('timestamp')),
+            wall_clock_seconds(order.get('ready_at'))
+        )
+        records.append(id_bytes)
+        records.append(body)
+        offset += len(id_bytes) + len(body)
+
+    mtime_ns, size = source_signature if source_signature is not None else _source_signature(source_file)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(orders), mtime_ns, size))
+        f.write(index.tobytes())
+        f.writelines(records)
+    os.replace(tmp_path, path)
+
+class OrderSnapshot:
+    """Read-only view over a published snapshot; records are decoded only when fetched"""
+
+    def __init__(self, path: str = SNAPSHOT_FILE):
+        with open(path, 'rb') as f:
+            self.file_id = os.fstat(f.fileno()).st_ino
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, mtime_ns, size = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an order snapshot")
+        self.source_signature = (mtime_ns, size)
+        # Zero-copy view of the index straight out of the mapping
+        self.index = np.frombuffer(self.buffer, dtype=INDEX_DTYPE, count=count, offset=HEADER.size)
+        self._positions: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def order_id(self, position: int) -> str:
+        entry = self.index[position]
+        start = int(entry["offset"])
+        return self.buffer[start:start + int(entry["id_length"])].decode('utf-8')
+
+    def record(self, position: int) -> Dict[str, Any]:
+        """Decode a single order by its position in the index"""
+        entry = self.index[position]
+        start = int(entry["offset"]) + int(entry["id_length"])
+        return json.loads(self.buffer[start:start + int(entry["length"])])
+
+    def positions(self) -> Dict[str, int]:
+        """Map order id to index position, built on first use"""
+        if self._positions is None:
+            self._positions = {self.order_id(i): i for i in range(len(self))}
+        return self._positions
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        position = self.positions().get(order_id)
+        return None if position is None else self.record(position)
+
+    def status_mask(self, statuses: List[str]) -> np.ndarray:
+        """Boolean array over the index, True where the order is in one of the statuses"""
+        codes = [_status_code(status) for status in statuses]
+        return np.isin(self.index["status"], codes)
+
+    def positions_with_status(self, statuses: List[str]) -> np.ndarray:
+        return np.flatnonzero(self.status_mask(statuses))
+
+    def orders(self, positions=None) -> Dict[str, Any]:
+        """Decode the given positions (default all) into an id -> order dict"""
+        if positions is None:
+            positions = range(len(self))
+        return {self.order_id(i): self.record(i) for i in positions}
+
+class SnapshotSet:
+    """Several snapshots read as one, e.g. archived orders followed by live ones"""
+
+    def __init__(self, snapshots: List[OrderSnapshot]):
+        self.snapshots = snapshots
+        self.starts = np.cumsum([0] + [len(snapshot) for snapshot in snapshots])
+        self.index = np.concatenate([snapshot.index for snapshot in snapshots])
+        self.source_signature = tuple(snapshot.source_signature for snapshot in snapshots)
+        self._positions: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _locate(self, position: int) -> Tuple[OrderSnapshot, int]:
+        part = int(np.searchsorted(self.starts, position, side='right')) - 1
+        return self.snapshots[part], int(position - self.starts[part])
+
+    def order_id(self, position: int) -> str:
+        snapshot, local = self._locate(position)
+        return snapshot.order_id(local)
+
+    def record(self, position: int) -> Dict[str, Any]:
+        snapshot, local = self._locate(position)
+        return snapshot.record(local)
+
+    def positions(self) -> Dict[str, int]:
+        """Map order id to position; later snapshots win if an id appears twice"""
+        if self._positions is None:
+            self._positions = {}
+            for snapshot, start in zip(self.snapshots, self.starts):
+                self._positions.update((order_id, int(start) + local) for order_id, local in snapshot.positions().items())
+        return self._positions
+
+    def status_mask(self, statuses: List[str]) -> np.ndarray:
+        return np.concatenate([snapshot.status_mask(statuses) for snapshot in self.snapshots])
+
+    def positions_with_status(self, statuses: List[str]) -> np.ndarray:
+        return np.flatnonzero(self.status_mask(statuses))
+
+# Held by local_database while it writes the order files and publishes, and by
+# rebuilds here, so a rebuild never races a writer's publish
+write_lock = threading.RLock()
+
+# One mapping per snapshot file per server process, shared by all sessions
+_snapshots: Dict[str, OrderSnapshot] = {}
+_history: Optional[SnapshotSet] = None
+_snapshot_lock = threading.Lock()
+
+def _file_id(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_ino
+    except OSError:
+        return None
+
+def _load_snapshot(snapshot: Optional[OrderSnapshot], path: str, file_id: Optional[int]) -> Optional[OrderSnapshot]:
+    """Reuse snapshot if it is still the published file, otherwise map the published file"""
+    if snapshot is not None and snapshot.file_id == file_id:
+        return snapshot
+    try:
+        return OrderSnapshot(path) if file_id is not None else None
+    except (OSError, ValueError, struct.error):
+        return None
+
+def get_orders_snapshot(path: str = SNAPSHOT_FILE, source_file: str = SOURCE_FILE) -> OrderSnapshot:
+    """Get the current snapshot, republishing it if orders.json has moved on"""
+    with _snapshot_lock:
+        file_id = _file_id(path)
+        snapshot = _load_snapshot(_snapshots.get(path), path, file_id)
+        if snapshot is None or snapshot.source_signature != _source_signature(source_file):
+            with write_lock:
+                # A writer may have published while we waited; only rebuild if it did not
+                snapshot = _load_snapshot(snapshot, path, _file_id(path))
+                if snapshot is None or snapshot.source_signature != _source_signature(source_file):
+                    # Missing, stale, written outside the app or by an older build: rebuild from the source of truth
+                    signature = _source_signature(source_file)
+                    orders = {}
+                    if os.path.exists(source_file):
+                        with open(source_file, 'r', encoding='utf-8') as f:
+                            orders = json.load(f)
+                    publish_snapshot(orders, path, source_file, signature)
+                    snapshot = OrderSnapshot(path)
+        _snapshots[path] = snapshot
+        return snapshot
+
+def get_order_history() -> SnapshotSet:
+    """Get archived and live orders as one snapshot, for statistics over all history"""
+    global _history
+    parts = [get_orders_snapshot(ARCHIVE_SNAPSHOT_FILE, ARCHIVE_SOURCE_FILE), get_orders_snapshot()]
+    with _snapshot_lock:
+        if _history is None or any(old is not new for old, new in zip(_history.snapshots, parts)):
+            _history = SnapshotSet(parts)
+        return _history
@@ -0,0 +1,96 @@
+import threading
+from typing import Dict, Any, List, Optional, Set
+
+from local_database import register_orders_cache
+
+# Customers quote the first characters of the order id
+ORDER_NUMBER_LENGTH = 8
+
+def order_number(order_id: str) -> str:
+    """Short, customer-facing form of an order id"""
+    return order_id[:ORDER_NUMBER_LENGTH].upper()
+
+class OrderStatusCache:
+    """Order id to status map with a reverse status index, for constant-time polling"""
+
+    def __init__(self):
+        self.statuses: Dict[str, str] = {}
+        self.by_status: Dict[str, Set[str]] = {}
+        # Several ids can share a short number, so each maps to a list
+        self.by_number: Dict[str, List[str]] = {}
+        self.customers: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def build(self, orders: Dict[str, Any]) -> None:
+        with self.lock:
+            self.statuses = {}
+            self.by_status = {}
+            self.by_number = {}
+            self.customers = {}
+            for order_id, order in orders.items():
+                self._set(order_id, order)
+
+    def set(self, order_id: str, order: Dict[str, Any]) -> None:
+        with self.lock:
+            self._remove(order_id)
+            self._set(order_id, order)
+
+    def remove(self, order_id: str) -> None:
+        with self.lock:
+            self._remove(order_id)
+
+    def _set(self, order_id: str, order: Dict[str, Any]) -> None:
+        status = order.get('status', 'pending')
+        self.statuses[order_id] = status
+        self.by_status.setdefault(status, set()).add(order_id)
+        self.by_number.setdefault(order_number(order_id), []).append(order_id)
+        self.customers[order_id] = order.get('customer_name', '')
+
+    def _remove(self, order_id: str) -> None:
+        status = self.statuses.pop(order_id, None)
+        if status is None:
+            return
+        self.by_status.get(status, set()).discard(order_id)
+        number = order_number(order_id)
+        sharing = self.by_number.get(number, [])
+        if order_id in sharing:
+            sharing.remove(order_id)
+        if not sharing:
+            self.by_number.pop(number, None)
+        self.customers.pop(order_id, None)
+
+    def find(self, order_ref: str) -> List[str]:
+        """Map a full order id or short order number to the matching order ids"""
+        order_ref = order_ref.strip()
+        if order_ref in self.statuses:
+            return [order_ref]
+        return list(self.by_number.get(order_ref.upper(), ()))
+
+def _apply_change(order_id: str, order: Optional[Dict[str, Any]]) -> None:
+    if order is None:
+        _cache.remove(order_id)
+    else:
+        _cache.set(order_id, order)
+
+# One cache per server process, shared by all sessions
+_cache = OrderStatusCache()
+_cache_state = register_orders_cache(_cache.build, _apply_change)
+
+def get_status_cache() -> OrderStatusCache:
+    """Get the shared cache, reloading only if orders.json was changed outside this process"""
+    _cache_state.refresh()
+    return _cache
+
+def find_orders(order_ref: str) -> List[str]:
+    """Get ids of orders matching a full id or short order number; more than one means the number is ambiguous"""
+    return get_status_cache().find(order_ref)
+
+def get_order_status(order_ref: str) -> Optional[str]:
+    """Get the status of an order by id or unambiguous order number without reading orders.json"""
+    cache = get_status_cache()
+    order_ids = cache.find(order_ref)
+    return cache.statuses.get(order_ids[0]) if len(order_ids) == 1 else None
+
+def get_order_ids_by_status(status: str) -> Set[str]:
+    """Get ids of all orders currently in the given status"""
+    return set(get_status_cache().by_status.get(status, ()))
@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+import pytest
+
+import local_database
+
+PLACED = datetime(2026, 1, 5, 12, 30)
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run each test against data files in its own scratch directory"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def reset_orders_caches(monkeypatch):
+    """Force every registered OrdersCache to rebuild from the test's orders.json"""
+    for cache in local_database._orders_caches:
+        monkeypatch.setattr(cache, "signature", None)
+
+
+@pytest.fixture
+def make_order() -> Callable[..., Dict[str, Any]]:
+    """Factory for orders in the current format with optional lifecycle timestamps"""
+    def factory(customer_name: str = "Asha", status: str = "pending", item: str = "Veg Momo", quantity: int = 1,
+                price: float = 80.0, instructions: str = "", placed: datetime = PLACED,
+                started: Optional[datetime] = None, ready: Optional[datetime] = None) -> Dict[str, Any]:
+        order = {
+            "customer_name": customer_name,
+            "items": [{"momo_type": item, "quantity": quantity, "price": price, "total": price * quantity}],
+            "special_instructions": instructions,
+            "total_amount": price * quantity,
+            "timestamp": placed.isoformat(),
+            "status": status
+        }
+        if started:
+            order["in_progress_at"] = started.isoformat()
+        if ready:
+            order["ready_at"] = ready.isoformat()
+        return order
+    return factory
@@ -0,0 +1,62 @@
+"""In-memory stand-in for the parts of the Firestore client cloud_sync uses."""
+from typing import Dict, Any, List, Optional
+
+
+class FakeDocument:
+    def __init__(self, collection: str, doc_id: str):
+        # The real client rejects ids that would change the document path
+        if not doc_id or "/" in doc_id:
+            raise ValueError(f"Invalid document id {doc_id!r}")
+        self.path = (collection, doc_id)
+        self.id = doc_id
+
+
+class FakeCollection:
+    def __init__(self, client: "FakeFirestore", name: str):
+        self.client = client
+        self.name = name
+
+    def document(self, doc_id: str) -> FakeDocument:
+        return FakeDocument(self.name, doc_id)
+
+    def list_documents(self) -> List[FakeDocument]:
+        return [FakeDocument(collection, doc_id) for collection, doc_id in self.client.documents if collection == self.name]
+
+
+class FakeBatch:
+    def __init__(self, client: "FakeFirestore"):
+        self.client = client
+        self.writes: List[tuple] = []
+
+    def set(self, doc_ref: FakeDocument, data: Dict[str, Any]) -> None:
+        self.writes.append((doc_ref.path, data))
+
+    def delete(self, doc_ref: FakeDocument) -> None:
+        self.writes.append((doc_ref.path, None))
+
+    def commit(self) -> None:
+        self.client.commit_calls += 1
+        if self.client.failures:
+            raise self.client.failures.pop(0)
+        for path, data in self.writes:
+            if data is None:
+                self.client.documents.pop(path, None)
+            else:
+                self.client.documents[path] = data
+        self.client.committed_batches.append(len(self.writes))
+
+
+class FakeFirestore:
+    """Records committed documents; queue exceptions in failures to fail the next commits"""
+
+    def __init__(self, failures: Optional[List[Exception]] = None):
+        self.documents: Dict[tuple, Dict[str, Any]] = {}
+        self.failures = list(failures or [])
+        self.commit_calls = 0
+        self.committed_batches: List[int] = []
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import admission_control
+from admission_control import DEFAULT_SETTINGS, compute_kitchen_load
+from local_database import ORDERS_FILE, save_json_file
+
+
+def test_window_selects_orders_by_ready_time(make_order):
+    now = datetime.now()
+    # Placed long before the window but cooked inside it
+    orders = {
+        f"done{idx}": make_order(status="picked_up", quantity=2, placed=now - timedelta(hours=5), started=now - timedelta(minutes=30 + 10 * idx), ready=now - timedelta(minutes=26 + 10 * idx))
+        for idx in range(3)
+    }
+    # Cooked before the window started
+    orders["old"] = make_order(status="picked_up", quantity=2, placed=now - timedelta(hours=5), started=now - timedelta(hours=4), ready=now - timedelta(hours=3))
+    save_json_file(ORDERS_FILE, orders)
+
+    load = compute_kitchen_load(dict(DEFAULT_SETTINGS))
+    assert load["samples"] == 3
+    assert load["unit_minutes"]["Veg Momo"] == pytest.approx(2.0)
+
+
+def test_in_progress_orders_count_only_remaining_time(make_order):
+    now = datetime.now()
+    save_json_file(ORDERS_FILE, {
+        "waiting": make_order(placed=now - timedelta(minutes=5), quantity=3),
+        "half_done": make_order(status="in_progress", placed=now - timedelta(minutes=5), started=now - timedelta(minutes=5), quantity=5),
+        "overdue": make_order(status="in_progress", placed=now - timedelta(minutes=30), started=now - timedelta(minutes=20), quantity=2)
+    })
+
+    load = compute_kitchen_load(dict(DEFAULT_SETTINGS))
+    # Default 2 min/unit: 6 min waiting + (10 - 5) min left on half_done + nothing left on overdue
+    assert load["queue_units"] == {"Veg Momo": 10}
+    assert load["queue_minutes"] == pytest.approx(11.0, abs=0.1)
+
+
+def test_orders_are_admitted_without_eta_when_load_is_unavailable(monkeypatch):
+    def broken_load(settings=None):
+        raise OSError("snapshot unavailable")
+
+    monkeypatch.setattr(admission_control, "get_kitchen_load", broken_load)
+    settings = dict(DEFAULT_SETTINGS, paused_items=["Chicken Momo"])
+    cart = [{"momo_type": "Veg Momo", "quantity": 40, "price": 80.0, "total": 3200.0}]
+    assert admission_control.admit_order(cart, settings) == (True, None, "")
+
+    admitted, eta, reason = admission_control.admit_order([dict(cart[0], momo_type="Chicken Momo")], settings)
+    assert not admitted and eta is None
+    assert "paused" in reason
@@ -0,0 +1,184 @@
+import json
+import os
+
+import pytest
+
+import cloud_sync
+import local_database
+from cloud_sync import (
+    CHANGE_LOG_FILE,
+    CHECKPOINT_FILE,
+    DEAD_LETTER_FILE,
+    FirestoreReplicator,
+    document_id,
+    read_checkpoint
+)
+from local_database import record_change, save_json_file
+from tests.fake_firestore import FakeFirestore
+
+
+@pytest.fixture(autouse=True)
+def journaling(monkeypatch):
+    monkeypatch.setattr(local_database, "_change_log_enabled", True)
+
+
+def test_document_id_escapes_invalid_keys():
+    assert document_id("Veg Momo") == "Veg Momo"
+    assert document_id("Veg/Paneer Momo") == "Veg%2FPaneer Momo"
+    assert document_id("100%/50%") == "100%25%2F50%25"
+    assert document_id("..").startswith("sha1_")
+    assert document_id("__meta__").startswith("sha1_")
+    assert document_id("x" * 2000).startswith("sha1_")
+
+
+def test_resumes_from_checkpoint(make_order):
+    client = FakeFirestore()
+    replicator = FirestoreReplicator(client, batch_size=2)
+    for idx in range(3):
+        record_change("orders", f"o{idx}", make_order(f"c{idx}"))
+
+    assert replicator.sync_once() == 2
+    assert read_checkpoint()["offset"] > 0
+
+    # A new replicator (e.g. after a restart) picks up where the last one stopped
+    restarted = FirestoreReplicator(client, batch_size=2)
+    assert restarted.sync_once() == 1
+    assert client.committed_batches == [2, 1]
+    assert set(client.documents) == {("orders", "o0"), ("orders", "o1"), ("orders", "o2")}
+
+
+def test_compacts_log_once_caught_up():
+    client = FakeFirestore()
+    replicator = FirestoreReplicator(client)
+    record_change("menu", "Veg Momo", 80.0)
+    replicator.sync_once()
+    assert os.path.getsize(CHANGE_LOG_FILE) > 0
+
+    assert replicator.sync_once() == 0
+    assert os.path.getsize(CHANGE_LOG_FILE) == 0
+    assert read_checkpoint()["offset"] == 0
+    assert client.documents[("menu", "Veg Momo")] == {"price": 80.0}
+
+    record_change("orders", "o1", None)
+    assert replicator.sync_once() == 1
+
+
+def test_backs_off_after_failed_commit(monkeypatch, make_order):
+    client = FakeFirestore(failures=[ConnectionError("unavailable")] * 2)
+    replicator = FirestoreReplicator(client, poll_interval=0.5)
+    record_change("orders", "o1", make_order("Asha"))
+
+    waits = []
+    def fake_wait(timeout):
+        waits.append(timeout)
+        if ("orders", "o1") in client.documents:
+            replicator.stop_event.set()
+    monkeypatch.setattr(replicator.stop_event, "wait", fake_wait)
+    monkeypatch.setattr(cloud_sync.random, "uniform", lambda low, high: 1.0)
+
+    replicator.run()
+
+    assert waits == [cloud_sync.INITIAL_BACKOFF, cloud_sync.INITIAL_BACKOFF * 2, 0.5]
+    assert replicator.last_error is None
+    assert ("orders", "o1") in client.documents
+
+
+def test_poison_change_is_dead_lettered(make_order):
+    class StrictFirestore(FakeFirestore):
+        def collection(self, name):
+            if name == "bad":
+                raise ValueError("Invalid collection")
+            return super().collection(name)
+
+    client = StrictFirestore()
+    replicator = FirestoreReplicator(client)
+    record_change("orders", "o1", make_order("Asha"))
+    record_change("bad", "x", {"a": 1})
+    record_change("menu", "Veg/Paneer Momo", {"price": 90.0})
+
+    with pytest.raises(ValueError):
+        replicator.sync_once()
+    assert replicator.sync_once() == 3
+
+    assert ("orders", "o1") in client.documents
+    assert ("menu", "Veg%2FPaneer Momo") in client.documents
+    with open(DEAD_LETTER_FILE, 'r', encoding='utf-8') as f:
+        dead = [json.loads(line) for line in f]
+    assert [entry["change"]["collection"] for entry in dead] == ["bad"]
+
+    # Batched mode resumes once the failed batch has been worked through
+    record_change("orders", "o2", make_order("Bikash"))
+    assert replicator.sync_once() == 1
+    assert client.committed_batches[-1] == 1
+
+
+def test_transient_failures_are_retried_not_dead_lettered(make_order):
+    client = FakeFirestore(failures=[ConnectionError("unavailable")] * 25)
+    replicator = FirestoreReplicator(client)
+    record_change("orders", "o1", make_order("Asha"))
+
+    for _ in range(25):
+        with pytest.raises(ConnectionError):
+            replicator.sync_once()
+    assert replicator.sync_once() == 1
+    assert replicator.dead_letter_count == 0
+    assert not os.path.exists(DEAD_LETTER_FILE)
+    assert ("orders", "o1") in client.documents
+
+
+def test_requeue_sends_current_local_state(make_order):
+    save_json_file("orders.json", {"o1": dict(make_order("Asha"), status="ready")})
+    with open(DEAD_LETTER_FILE, 'w', encoding='utf-8') as f:
+        for change in ({"collection": "orders", "doc_id": "o1", "data": make_order("Asha")},
+                       {"collection": "orders", "doc_id": "gone", "data": make_order("Vansh")}):
+            f.write(json.dumps({"change": change, "error": "rejected"}) + "\n")
+
+    client = FakeFirestore()
+    client.documents[("orders", "gone")] = make_order("Vansh")
+    assert cloud_sync.requeue_dead_letters() == 2
+    assert not os.path.exists(DEAD_LETTER_FILE)
+
+    FirestoreReplicator(client).sync_once()
+    assert client.documents[("orders", "o1")]["status"] == "ready"
+    assert ("orders", "gone") not in client.documents
+
+
+def test_start_replication_reseeds_unjournaled_writes(monkeypatch, make_order):
+    monkeypatch.setattr(local_database, "_change_log_enabled", False)
+    monkeypatch.setattr(FirestoreReplicator, "start", lambda self: None)
+    client = FakeFirestore()
+
+    save_json_file("orders.json", {"o1": make_order("Asha")})
+    replicator = cloud_sync.start_replication(client)
+    replicator.sync_once()
+    replicator.sync_once()
+    assert read_checkpoint()["signatures"]
+
+    # Nothing changed: a restart does not replay the whole store
+    monkeypatch.setattr(local_database, "_change_log_enabled", False)
+    replicator = cloud_sync.start_replication(client)
+    assert os.path.getsize(CHANGE_LOG_FILE) == 0
+
+    # Written while replication was not configured, so never journaled
+    monkeypatch.setattr(local_database, "_change_log_enabled", False)
+    save_json_file("orders.json", {"o1": make_order("Asha"), "o2": make_order("Vansh")})
+    replicator = cloud_sync.start_replication(client)
+    replicator.sync_once()
+    assert ("orders", "o2") in client.documents
+    assert os.path.exists(CHECKPOINT_FILE)
+
+
+def test_reseed_removes_documents_deleted_while_unjournaled(monkeypatch, make_order):
+    monkeypatch.setattr(local_database, "_change_log_enabled", False)
+    monkeypatch.setattr(FirestoreReplicator, "start", lambda self: None)
+    client = FakeFirestore()
+    client.documents[("orders", "deleted")] = make_order("Asha")
+    client.documents[("menu", "Veg%2FPaneer Momo")] = {"price": 90.0}
+    save_json_file("orders.json", {"kept": make_order("Vansh")})
+    save_json_file("menu.json", {"Veg Momo": {"price": 80.0}})
+
+    replicator = cloud_sync.start_replication(client)
+    while replicator.sync_once():
+        pass
+    assert set(client.documents) == {("orders", "kept"), ("menu", "Veg Momo")}
+    assert not replicator.reconcile_pending
@@ -0,0 +1,83 @@
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from demand_forecast import DemandModel, get_demand_model, time_to_serve
+from local_database import ORDERS_FILE, delete_order, save_json_file, save_order
+from order_snapshot import get_order_history, wall_clock_seconds
+from tests.conftest import PLACED
+
+
+def units(model: DemandModel, item: str, placed: datetime) -> float:
+    hour = int(wall_clock_seconds(placed.isoformat()) // 3600)
+    return model.hourly[model.item_index[item], hour - model.start_hour]
+
+
+def test_local_writes_are_applied_exactly(make_order):
+    save_json_file(ORDERS_FILE, {})
+    model = get_demand_model()
+
+    first = save_order(make_order(quantity=2))
+    # Placed earlier than anything seen so far
+    save_order(make_order(placed=PLACED - timedelta(days=3), quantity=4, item="Buff Momo"))
+    model = get_demand_model()
+    assert units(model, "Veg Momo", PLACED) == 2
+    assert units(model, "Buff Momo", PLACED - timedelta(days=3)) == 4
+
+    delete_order(first)
+    model = get_demand_model()
+    assert units(model, "Veg Momo", PLACED) == 0
+    assert model.hourly.sum() == 4
+
+
+def test_replaced_file_is_rebuilt(make_order):
+    save_order(make_order(quantity=5))
+    assert get_demand_model().hourly.sum() == 5
+
+    with open(ORDERS_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"other": make_order(placed=PLACED + timedelta(hours=1))}, f)
+    model = get_demand_model()
+    assert model.hourly.sum() == 1
+    assert units(model, "Veg Momo", PLACED + timedelta(hours=1)) == 1
+
+
+def test_time_to_serve_compares_periods(make_order):
+    now = datetime(2026, 1, 20, 12, 0)
+    save_json_file(ORDERS_FILE, {
+        "this_week": make_order(placed=now - timedelta(days=1), ready=now - timedelta(days=1) + timedelta(minutes=10)),
+        "last_week": make_order(placed=now - timedelta(days=10), ready=now - timedelta(days=10) + timedelta(minutes=20)),
+        "waiting": make_order(placed=now - timedelta(hours=1))
+    })
+    serve = time_to_serve(get_order_history(), wall_clock_seconds(now.isoformat()) / 3600)
+    assert serve["current"] == pytest.approx(10.0)
+    assert serve["previous"] == pytest.approx(20.0)
+
+
+def test_patched_model_matches_a_fresh_build(make_order):
+    orders = {f"o{idx}": make_order(placed=PLACED + timedelta(hours=idx % 5), quantity=idx % 3 + 1) for idx in range(20)}
+    model = DemandModel()
+    model.build(orders)
+    for idx in range(15):
+        order_id = f"o{idx}"
+        if idx % 3 == 0:
+            del orders[order_id]
+            model.apply(order_id, None)
+        else:
+            orders[order_id] = make_order(placed=PLACED - timedelta(hours=idx), quantity=idx, item="Buff Momo")
+            model.apply(order_id, orders[order_id])
+    # Status changes keep the order's lines in place
+    model.apply("o19", dict(orders["o19"], status="ready"))
+    assert model.dead <= model.size // 2
+
+    fresh = DemandModel()
+    fresh.build(orders)
+    # The patched matrix may keep empty rows and hours that a fresh build never sees
+    assert sorted(model.items) == sorted(fresh.items)
+    offset = fresh.start_hour - model.start_hour
+    width = fresh.hourly.shape[1]
+    for item, row in fresh.item_index.items():
+        patched = model.hourly[model.item_index[item]]
+        assert np.array_equal(patched[offset:offset + width], fresh.hourly[row])
+        assert patched.sum() == fresh.hourly[row].sum()
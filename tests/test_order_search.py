@@ -0,0 +1,34 @@
+import json
+
+from local_database import ORDERS_FILE, delete_order, save_order, update_order_status
+from order_search import search_orders
+
+
+def test_local_writes_update_index_incrementally(make_order):
+    first = save_order(make_order("Vansh"))
+    assert search_orders("vans") == {first}
+
+    second = save_order(make_order("Asha", instructions="no onion"))
+    assert search_orders("asha onion") == {second}
+    update_order_status(second, "in_progress")
+    assert search_orders("veg") == {first, second}
+
+    delete_order(first)
+    assert search_orders("vansh") == set()
+
+
+def test_outside_write_is_not_hidden_by_local_write(make_order):
+    save_order(make_order("Vansh"))
+    assert search_orders("mayo") == set()
+
+    # Another process appends an order directly to orders.json
+    with open(ORDERS_FILE, 'r', encoding='utf-8') as f:
+        orders = json.load(f)
+    orders["outside"] = make_order("Asha", instructions="extra mayo")
+    with open(ORDERS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(orders, f)
+
+    # A local write straight after must not mark the index as current
+    local = save_order(make_order("Bikash"))
+    assert search_orders("extra mayo") == {"outside"}
+    assert search_orders("bikash") == {local}
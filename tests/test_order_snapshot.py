@@ -0,0 +1,60 @@
+import json
+import threading
+
+from local_database import ORDERS_FILE, get_file_signature, save_json_file, save_order, update_order_status
+from order_snapshot import OrderSnapshot, SNAPSHOT_FILE, get_orders_snapshot
+
+
+def test_snapshot_matches_orders_after_concurrent_writes(make_order):
+    def place_orders(prefix):
+        for idx in range(10):
+            order_id = save_order(make_order(f"{prefix}{idx}"))
+            update_order_status(order_id, "in_progress")
+
+    threads = [threading.Thread(target=place_orders, args=(name,)) for name in ("Asha", "Vansh", "Bikash")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(ORDERS_FILE, 'r', encoding='utf-8') as f:
+        orders = json.load(f)
+    published = OrderSnapshot(SNAPSHOT_FILE)
+    assert len(orders) == 30
+    assert published.source_signature == get_file_signature(ORDERS_FILE)
+    assert published.orders() == orders
+    assert len(get_orders_snapshot().positions_with_status(["in_progress"])) == 30
+
+
+def test_outside_write_is_republished(make_order):
+    save_order(make_order("Asha"))
+    with open(ORDERS_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"outside": make_order("Vansh")}, f)
+    assert list(get_orders_snapshot().positions()) == ["outside"]
+
+
+def test_readers_never_see_a_partial_write(make_order):
+    save_json_file(ORDERS_FILE, {f"seed{idx}": make_order(f"Seed{idx}") for idx in range(2000)})
+    done = threading.Event()
+    errors = []
+
+    def read_snapshots():
+        while not done.is_set():
+            try:
+                get_orders_snapshot()
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=read_snapshots) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    try:
+        for idx in range(15):
+            save_order(make_order(f"Asha{idx}"))
+    finally:
+        done.set()
+        for reader in readers:
+            reader.join()
+
+    assert errors == []
+    assert len(get_orders_snapshot()) == 2015
@@ -0,0 +1,86 @@
+
+from datetime import datetime
+
+import local_database
+from local_database import (
+    ARCHIVE_FILE,
+    ORDERS_FILE,
+    get_order_statistics,
+    get_orders,
+    load_json_file,
+    save_json_file,
+    save_order,
+    update_order_status
+)
+from order_snapshot import get_order_history, get_orders_snapshot
+from order_status import OrderStatusCache, find_orders, get_order_ids_by_status, get_order_status, order_number
+
+
+def test_status_follows_local_transitions(make_order):
+    order_id = save_order(make_order("Vansh"))
+    assert get_order_status(order_number(order_id)) == "pending"
+    update_order_status(order_id, "in_progress")
+    update_order_status(order_id, "ready")
+    assert get_order_status(order_id) == "ready"
+    assert get_order_ids_by_status("ready") == {order_id}
+
+
+def test_outside_write_is_picked_up(make_order):
+    order_id = save_order(make_order("Vansh"))
+    assert get_order_status(order_id) == "pending"
+    save_json_file(ORDERS_FILE, {order_id: make_order("Vansh", "ready"), "abc": make_order("Asha")})
+    save_order(make_order("Bikash"))
+    assert get_order_status(order_id) == "ready"
+    assert get_order_status("abc") == "pending"
+
+
+def test_shared_short_number_is_ambiguous(make_order):
+    cache = OrderStatusCache()
+    first, second = "deadbeef-0001", "deadbeef-0002"
+    cache.build({first: make_order("Asha"), second: make_order("Vansh", "ready")})
+    assert sorted(cache.find("DEADBEEF")) == [first, second]
+    assert cache.find(second) == [second]
+
+    cache.remove(first)
+    assert cache.find("deadbeef") == [second]
+    cache.set(second, make_order("Vansh", "picked_up"))
+    assert cache.find("deadbeef") == [second]
+
+
+def test_ambiguous_number_has_no_single_status(make_order):
+    save_json_file(ORDERS_FILE, {"deadbeef-0001": make_order("Asha"), "deadbeef-0002": make_order("Vansh")})
+    assert len(find_orders("deadbeef")) == 2
+    assert get_order_status("deadbeef") is None
+    assert get_order_status("deadbeef-0002") == "pending"
+
+
+def test_cancelled_orders_earn_no_revenue(make_order):
+    save_json_file(ORDERS_FILE, {"a": make_order("Asha", price=100.0), "b": make_order("Vansh", "cancelled", price=40.0)})
+    snapshot = get_orders_snapshot()
+    billed = ~snapshot.status_mask(["cancelled"])
+    assert snapshot.index["total_amount"][billed].sum() == 100.0
+
+    stats = get_order_statistics()
+    assert stats["total_orders"] == 2
+    assert stats["pending_orders"] == 1
+
+
+def test_old_finished_orders_are_archived(make_order, monkeypatch):
+    monkeypatch.setattr(local_database, "ARCHIVE_BATCH_SIZE", 2)
+    old = {order_id: make_order(order_id, "ready") for order_id in ("a", "b")}
+    save_json_file(ORDERS_FILE, {**old, "c": make_order("c", "ready", placed=datetime.now())})
+    assert get_order_status("a") == "ready"
+
+    # Archived in batches, and only once old
+    update_order_status("a", "picked_up")
+    assert set(get_orders()) == {"a", "b", "c"}
+    update_order_status("b", "picked_up")
+    update_order_status("c", "picked_up")
+    assert set(get_orders()) == {"c"}
+    assert set(load_json_file(ARCHIVE_FILE, {})) == {"a", "b"}
+
+    # Archived orders still count everywhere history is read
+    assert get_order_status("a") == "picked_up"
+    assert get_order_statistics()["total_orders"] == 3
+    assert len(get_order_history()) == 3
+    assert len(get_orders_snapshot()) == 1